@@ -0,0 +1,9 @@
+"""Микробенчмарки проекта: ``python -m benchmarks.<модуль>``."""
+import os
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+    django.setup()
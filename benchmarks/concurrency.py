@@ -0,0 +1,265 @@
+"""Пропускная способность страниц новостей под параллельной нагрузкой.
+
+Сравнивает три пути обработки запроса:
+
+* ``wsgi`` — синхронные представления за WSGI, пул потоков сервера;
+* ``asgi-sync`` — те же представления под ASGI, как было до асинхронных
+  вариантов: Django 3.2 выполняет их в одном общем потоке;
+* ``asgi`` — асинхронные представления (``news.async_views``) с пулом
+  ``ASYNC_VIEW_WORKERS`` потоков.
+
+Обработчики WSGI и ASGI вызываются напрямую, без сети, каждый режим —
+в отдельном процессе. База берётся из настроек проекта:
+
+    python manage.py generate_data --users 100 --news 1000 --comments 50000
+    python -m benchmarks.concurrency --concurrency 32 --requests 2000
+
+SQLite работает в том же процессе, поэтому выигрыш от параллельного
+ожидания базы на нём почти не виден; ``--db-latency`` добавляет к
+каждому запросу задержку, как у сетевой СУБД.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from time import perf_counter, sleep
+
+MODES = {
+    'wsgi': '0',
+    'asgi-sync': '0',
+    'asgi': '1',
+}
+HOST = 'localhost'
+
+
+def get_paths(pages):
+    """Главная, архив и страницы самых обсуждаемых новостей."""
+    from django.urls import reverse
+
+    from news.models import News
+
+    news_list = list(
+        News.objects.order_by('-comment_count').values('pk', 'date')[:pages]
+    )
+    if not news_list:
+        sys.exit('База пуста: сначала запустите manage.py generate_data.')
+    paths = [
+        reverse('news:home'),
+        reverse('news:archive_year', args=(news_list[0]['date'].year,)),
+    ]
+    paths.extend(
+        reverse('news:detail', args=(news['pk'],)) for news in news_list
+    )
+    return paths
+
+
+def add_db_latency(delay):
+    """Задержка перед каждым SQL-запросом во всех соединениях."""
+    from django.db.backends.signals import connection_created
+
+    def delayed(execute, sql, params, many, context):
+        sleep(delay)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(delayed)
+
+    connection_created.connect(install, weak=False)
+
+
+def wsgi_get(handler, path):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+
+    def start_response(status_line, headers):
+        status.append(int(status_line.split()[0]))
+
+    response = handler(environ, start_response)
+    b''.join(response)
+    response.close()
+    return status[0]
+
+
+async def asgi_get(application, path):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'headers': [(b'host', HOST.encode())],
+        'server': (HOST, 80),
+        'client': ('127.0.0.1', 0),
+    }
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def timed(get, *args):
+    start = perf_counter()
+    status = get(*args)
+    if status >= 400:
+        raise RuntimeError(f'{args[-1]}: ответ {status}')
+    return perf_counter() - start
+
+
+async def timed_async(get, *args):
+    start = perf_counter()
+    status = await get(*args)
+    if status >= 400:
+        raise RuntimeError(f'{args[-1]}: ответ {status}')
+    return perf_counter() - start
+
+
+def run_wsgi(paths, requests, concurrency):
+    from django.core.wsgi import get_wsgi_application
+
+    handler = get_wsgi_application()
+    schedule = [paths[index % len(paths)] for index in range(requests)]
+    for path in paths:
+        timed(wsgi_get, handler, path)
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = perf_counter()
+        latencies = list(
+            pool.map(lambda path: timed(wsgi_get, handler, path), schedule)
+        )
+        return latencies, perf_counter() - start
+
+
+def run_asgi(paths, requests, concurrency):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    schedule = [paths[index % len(paths)] for index in range(requests)]
+
+    async def main():
+        for path in paths:
+            await timed_async(asgi_get, application, path)
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(path):
+            async with limit:
+                return await timed_async(asgi_get, application, path)
+
+        start = perf_counter()
+        latencies = await asyncio.gather(*(one(path) for path in schedule))
+        return latencies, perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def child(options):
+    from benchmarks import setup
+
+    setup()
+    # Построчный лог метрик на каждый запрос только исказил бы замер.
+    logging.getLogger('yanews.metrics').setLevel(logging.WARNING)
+    paths = get_paths(options.pages)
+    if options.db_latency:
+        add_db_latency(options.db_latency / 1000)
+    run = run_wsgi if options.mode == 'wsgi' else run_asgi
+    latencies, elapsed = run(paths, options.requests, options.concurrency)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    print(json.dumps({
+        'mode': options.mode,
+        'requests': options.requests,
+        'concurrency': options.concurrency,
+        'rps': round(options.requests / elapsed, 1),
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+    }))
+
+
+def parent(options):
+    results = []
+    for mode in options.modes:
+        command = [
+            sys.executable, '-m', 'benchmarks.concurrency',
+            '--mode', mode,
+            '--requests', str(options.requests),
+            '--concurrency', str(options.concurrency),
+            '--pages', str(options.pages),
+            '--db-latency', str(options.db_latency),
+        ]
+        env = {**os.environ, 'YANEWS_ASYNC_VIEWS': MODES[mode]}
+        output = subprocess.run(
+            command, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+    print(
+        f'{"режим":<12}{"запр/с":>10}{"p50, мс":>10}'
+        f'{"p95, мс":>10}{"p99, мс":>10}'
+    )
+    for result in results:
+        print(
+            f'{result["mode"]:<12}{result["rps"]:>10.1f}'
+            f'{result["p50_ms"]:>10.3f}{result["p95_ms"]:>10.3f}'
+            f'{result["p99_ms"]:>10.3f}'
+        )
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument(
+        '--modes', nargs='+', choices=MODES, default=list(MODES),
+    )
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument(
+        '--pages', type=int, default=50,
+        help='Сколько разных страниц новостей запрашивать по кругу.',
+    )
+    parser.add_argument(
+        '--db-latency', type=float, default=0,
+        help='Задержка каждого SQL-запроса, мс.',
+    )
+    parser.add_argument('--output', help='Куда сохранить результаты JSON.')
+    options = parser.parse_args()
+    if options.mode:
+        child(options)
+    else:
+        parent(options)
+
+
+if __name__ == '__main__':
+    main()
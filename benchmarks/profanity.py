@@ -0,0 +1,68 @@
+"""Автомат Ахо — Корасик против прежнего цикла ``word in text``.
+
+    python -m benchmarks.profanity --words 10000 --length 5000
+
+Сравнивает время проверки одного комментария на случайных словах.
+"""
+import argparse
+import random
+import timeit
+
+from benchmarks import setup
+
+setup()
+
+from news.profanity import ProfanityMatcher  # noqa: E402
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+
+
+def linear_scan(words, text):
+    """Проверка, которой CommentForm.clean_text пользовалась раньше."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+def random_word(rng, length):
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, default=10_000)
+    parser.add_argument('--length', type=int, default=5_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args()
+
+    rng = random.Random(options.seed)
+    words = [
+        random_word(rng, rng.randint(8, 14)) for _ in range(options.words)
+    ]
+    text_words = []
+    while sum(map(len, text_words)) < options.length:
+        text_words.append(random_word(rng, rng.randint(2, 7)))
+    text = ' '.join(text_words)
+
+    build = timeit.timeit(lambda: ProfanityMatcher(words), number=1)
+    matcher = ProfanityMatcher(words)
+    assert matcher.search(text) == linear_scan(words, text)
+    linear = timeit.timeit(
+        lambda: linear_scan(words, text), number=options.repeat
+    ) / options.repeat
+    automaton = timeit.timeit(
+        lambda: matcher.search(text), number=options.repeat
+    ) / options.repeat
+
+    print(f'слов: {options.words}, длина текста: {len(text)}')
+    print(f'сборка автомата: {build * 1000:.1f} мс (один раз)')
+    print(f'цикл word in text: {linear * 1000:.3f} мс на комментарий')
+    print(f'Ахо — Корасик:     {automaton * 1000:.3f} мс на комментарий')
+    print(f'ускорение: {linear / automaton:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Цена ограничения частоты на один изменяющий запрос.
+
+    python -m benchmarks.ratelimit --keys 100000 --threads 8
+
+Замеряет ``retry_after`` — то, что добавляется к каждому POST
+комментария: два ведра (IP и пользователь) из памяти процесса и из
+кэша Django (в проекте — LocMemCache).
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks import setup
+
+setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from news.ratelimit import get_limiter, retry_after  # noqa: E402
+
+LIMITERS = ('news.ratelimit.LocalBuckets', 'news.ratelimit.CacheBuckets')
+
+
+def make_requests(rng, count, keys):
+    factory = RequestFactory()
+    requests = []
+    for _ in range(count):
+        key = rng.randrange(keys)
+        address = f'10.{key >> 16 & 255}.{key >> 8 & 255}.{key & 255}'
+        request = factory.post('/', REMOTE_ADDR=address)
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = f'session-{key}'
+        requests.append(request)
+    return requests
+
+
+def run(requests, threads):
+    """
+    Время одного ``retry_after`` в микросекундах.
+
+    Полное время прогона делится на число запросов, так что при
+    нескольких потоках в него входит и ожидание блокировок и GIL.
+    """
+    chunks = [requests[index::threads] for index in range(threads)]
+    workers = [
+        threading.Thread(
+            target=lambda chunk: [retry_after(item) for item in chunk],
+            args=(chunk,),
+        )
+        for chunk in chunks
+    ]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return (time.perf_counter() - start) / len(requests) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200_000)
+    parser.add_argument('--keys', type=int, default=100_000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args()
+
+    settings.COMMENT_RATE_LIMITS = {'user': (10, 60), 'ip': (60, 60)}
+    rng = random.Random(options.seed)
+    requests = make_requests(rng, options.requests, options.keys)
+    print(
+        f'запросов: {options.requests}, ключей: {options.keys}, '
+        f'лимиты: {settings.COMMENT_RATE_LIMITS}'
+    )
+    for path in LIMITERS:
+        settings.COMMENT_RATE_LIMITER = path
+        for threads in (1, options.threads):
+            get_limiter.cache_clear()
+            micros = run(requests, threads)
+            name = path.rsplit('.', 1)[1]
+            print(
+                f'{name:13} потоков: {threads:2}  '
+                f'{micros:6.2f} мкс на запрос'
+            )
+
+
+if __name__ == '__main__':
+    main()
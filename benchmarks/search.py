@@ -0,0 +1,93 @@
+"""Время поискового запроса при росте корпуса.
+
+Корпус строится во временной базе SQLite с той же таблицей FTS5, что и
+в миграции, и растёт шагами в 10 раз. Редкое слово встречается в
+постоянном числе документов, и время его поиска от размера корпуса не
+зависит. Частое слово встречается в доле корпуса: чтобы отранжировать
+совпадения, FTS5 оценивает их все, так что время растёт вместе с ними.
+
+
+    python -m benchmarks.search --max-rows 1000000
+"""
+import argparse
+import importlib
+import random
+import sqlite3
+import tempfile
+import timeit
+from pathlib import Path
+
+from benchmarks import setup
+
+setup()
+
+from news.search import SEARCH_SQL, build_match  # noqa: E402
+
+WORDS = (
+    'город погода выборы спорт футбол курс рубль наука космос театр '
+    'премьера дорога пробка школа экзамен лето зима рынок цены концерт'
+).split()
+RARE_WORD = 'пингвин'
+RARE_PER_STEP = 20
+
+
+def create_table(connection):
+    migration = importlib.import_module('news.migrations.0005_search')
+    for statement in migration.CREATE_SQL[:2]:
+        connection.execute(statement)
+
+
+def fill(connection, rng, start, stop):
+    rare = set(rng.sample(range(start, stop), RARE_PER_STEP))
+
+    def rows():
+        for index in range(start, stop):
+            words = rng.choices(WORDS, k=rng.randint(5, 40))
+            if index in rare:
+                words.append(RARE_WORD)
+            yield index * 2, ' '.join(words[:4]), ' '.join(words), index
+
+    connection.executemany(
+        'INSERT INTO news_search(rowid, title, body, news_id) '
+        'VALUES (?, ?, ?, ?)',
+        rows(),
+    )
+    connection.commit()
+
+
+def query_time(connection, word, repeat):
+    sql = SEARCH_SQL.format(seek='').replace('%s', '?')
+    params = (build_match(word), 21)
+    return timeit.timeit(
+        lambda: connection.execute(sql, params).fetchall(), number=repeat
+    ) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--max-rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args()
+
+    rng = random.Random(options.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        connection = sqlite3.connect(Path(directory) / 'search.sqlite3')
+        create_table(connection)
+        print(f'{"строк":>10}{"редкое, мс":>14}{"частое, мс":>14}')
+        size = 0
+        step = 10_000
+        while step <= options.max_rows:
+            fill(connection, rng, size, step)
+            size = step
+            rare = query_time(connection, RARE_WORD, options.repeat)
+            common = query_time(
+                connection, WORDS[0], max(options.repeat // 10, 1)
+            )
+            print(f'{size:>10}{rare * 1000:>14.3f}{common * 1000:>14.3f}')
+            step *= 10
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
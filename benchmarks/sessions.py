@@ -0,0 +1,122 @@
+"""Цена сессий и аутентификации на запрос страницы.
+
+    python manage.py migrate
+    python -m benchmarks.sessions --requests 500
+
+Главная и страница новости запрашиваются анонимно и от вошедшего
+пользователя при каждом хранилище сессий из ``SESSION_ENGINES``, а
+также без middleware сессий, аутентификации, сообщений и CSRF. Это
+нижняя граница: столько стоила бы страница, если бы сессий не было
+вовсе. Изменения базы, сделанные во время прогона, откатываются.
+"""
+import argparse
+import logging
+
+from benchmarks import setup
+
+setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.db import transaction  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.views import HOST, Rollback, measure  # noqa: E402
+from news.models import News  # noqa: E402
+
+User = get_user_model()
+
+SESSION_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+)
+
+
+def anonymous_user(get_response):
+    """Замена аутентификации для прогона без сессий."""
+    def middleware(request):
+        request.user = AnonymousUser()
+        return get_response(request)
+    return middleware
+
+
+def scenarios(user, urls):
+    anonymous = Client(HTTP_HOST=HOST)
+    author = Client(HTTP_HOST=HOST)
+    author.force_login(user)
+    # Первый ответ ставит cookie CSRF, отпечаток которой входит в ETag.
+    for url in urls.values():
+        author.get(url)
+    etags = {
+        (client, url): client.get(url)['ETag']
+        for client in (anonymous, author) for url in urls.values()
+    }
+
+    def nothing():
+        return None
+
+    def get(client, url, **headers):
+        return nothing, lambda _: client.get(url, **headers)
+
+    for name, url in urls.items():
+        for who, client in (('аноним', anonymous), ('автор', author)):
+            yield f'{name} {who}', get(client, url)
+            yield f'{name} {who} 304', get(
+                client, url, HTTP_IF_NONE_MATCH=etags[client, url]
+            )
+
+
+def run(requests):
+    news = News.objects.create(title='Новость', text='Текст новости')
+    user = User.objects.create(username='benchmark-sessions')
+    urls = {
+        'главная': reverse('news:home'),
+        'новость': reverse('news:detail', args=(news.pk,)),
+    }
+    results = {}
+    for engine, path in settings.SESSION_ENGINES.items():
+        with override_settings(SESSION_ENGINE=path):
+            for name, (prepare, send) in scenarios(user, urls):
+                results[engine, name] = measure(name, requests, prepare, send)
+    middleware = [
+        path for path in settings.MIDDLEWARE
+        if path not in SESSION_MIDDLEWARE
+    ]
+    middleware.insert(0, f'{__name__}.anonymous_user')
+    with override_settings(MIDDLEWARE=middleware):
+        anonymous = Client(HTTP_HOST=HOST)
+        for name, url in urls.items():
+            results['без сессий', f'{name} аноним'] = measure(
+                name, requests, lambda: None,
+                lambda _, url=url: anonymous.get(url),
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    options = parser.parse_args()
+
+    logging.getLogger('yanews.metrics').setLevel(logging.WARNING)
+    results = {}
+    try:
+        with transaction.atomic():
+            results.update(run(options.requests))
+            raise Rollback
+    except Rollback:
+        pass
+    print(f'{"сессии":<12}{"сценарий":<22}{"p50, мс":>9}{"запросов":>10}')
+    for (engine, name), result in results.items():
+        print(
+            f'{engine:<12}{name:<22}{result["p50_ms"]:>9.3f}'
+            f'{result["queries_mean"]:>10.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
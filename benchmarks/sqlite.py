@@ -0,0 +1,189 @@
+"""Нагрузка на SQLite: одновременные комментарии и чтение страниц.
+
+Писатели добавляют комментарии так же, как форма на странице новости
+(чтение новости и запись в одной транзакции, плюс счётчик комментариев),
+читатели выбирают страницы комментариев. Каждый профиль запускается в
+отдельном процессе на копии базы проекта, сама база не меняется:
+
+    python manage.py generate_data --users 100 --news 1000 --comments 50000
+    python -m benchmarks.sqlite --writers 4 --readers 8 --seconds 10
+
+``default`` — стандартный журнал и BEGIN, ``tuned`` — профиль
+``YANEWS_SQLITE_TUNING=1`` из настроек.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+from time import perf_counter
+
+PROFILES = {
+    'default': '0',
+    'tuned': '1',
+}
+
+
+def use_copy(directory):
+    """Переключает настройки на копию базы до первого соединения."""
+    from django.conf import settings
+
+    database = settings.DATABASES['default']
+    copy = os.path.join(directory, 'db.sqlite3')
+    shutil.copyfile(database['NAME'], copy)
+    database['NAME'] = copy
+
+
+def worker(operation, deadline, results):
+    from django.db import DatabaseError, close_old_connections
+
+    latencies, errors = [], 0
+    while perf_counter() < deadline:
+        close_old_connections()
+        start = perf_counter()
+        try:
+            operation()
+        except DatabaseError:
+            errors += 1
+        else:
+            latencies.append(perf_counter() - start)
+    close_old_connections()
+    results.append((latencies, errors))
+
+
+def child(options):
+    from benchmarks import setup
+
+    setup()
+    with tempfile.TemporaryDirectory() as directory:
+        use_copy(directory)
+        run(options)
+
+
+def run(options):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+
+    from news.models import Comment, News
+
+    news_ids = list(
+        News.objects.order_by('-comment_count')
+        .values_list('pk', flat=True)[:options.pages]
+    )
+    author = get_user_model().objects.first()
+    if not news_ids or author is None:
+        sys.exit('База пуста: сначала запустите manage.py generate_data.')
+
+    def write():
+        with transaction.atomic():
+            news = News.objects.get(pk=random.choice(news_ids))
+            Comment.objects.create(
+                news=news, author=author, text='Нагрузочный комментарий'
+            )
+
+    page_size = settings.COMMENTS_COUNT_ON_DETAIL_PAGE
+
+    def read():
+        list(
+            Comment.objects.published()
+            .filter(news=random.choice(news_ids))
+            .select_related('author')
+            .order_by('created', 'pk')[:page_size]
+        )
+
+    deadline = perf_counter() + options.seconds
+    results = {'write': [], 'read': []}
+    threads = [
+        threading.Thread(
+            target=worker, args=(operation, deadline, results[kind])
+        )
+        for kind, operation, count in (
+            ('write', write, options.writers),
+            ('read', read, options.readers),
+        )
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = {'profile': options.profile}
+    for kind, parts in results.items():
+        latencies = [value for part, _ in parts for value in part]
+        cuts = statistics.quantiles(
+            latencies or [0, 0], n=100, method='inclusive'
+        )
+        summary[kind] = {
+            'ops': round(len(latencies) / options.seconds, 1),
+            'errors': sum(errors for _, errors in parts),
+            'p50_ms': round(cuts[49] * 1000, 3),
+            'p99_ms': round(cuts[98] * 1000, 3),
+        }
+    print(json.dumps(summary))
+
+
+def parent(options):
+    results = []
+    for profile in options.profiles:
+        command = [
+            sys.executable, '-m', 'benchmarks.sqlite',
+            '--profile', profile,
+            '--writers', str(options.writers),
+            '--readers', str(options.readers),
+            '--seconds', str(options.seconds),
+            '--pages', str(options.pages),
+        ]
+        env = {**os.environ, 'YANEWS_SQLITE_TUNING': PROFILES[profile]}
+        output = subprocess.run(
+            command, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+    print(
+        f'{"профиль":<10}{"операция":<10}{"опер/с":>10}{"ошибки":>10}'
+        f'{"p50, мс":>10}{"p99, мс":>10}'
+    )
+    for result in results:
+        for kind in ('write', 'read'):
+            row = result[kind]
+            print(
+                f'{result["profile"]:<10}{kind:<10}{row["ops"]:>10.1f}'
+                f'{row["errors"]:>10}{row["p50_ms"]:>10.3f}'
+                f'{row["p99_ms"]:>10.3f}'
+            )
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--profile', choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument(
+        '--profiles', nargs='+', choices=PROFILES, default=list(PROFILES),
+    )
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument(
+        '--pages', type=int, default=50,
+        help='Сколько самых обсуждаемых новостей комментировать и читать.',
+    )
+    parser.add_argument('--output', help='Куда сохранить результаты JSON.')
+    options = parser.parse_args()
+    if options.profile:
+        child(options)
+    else:
+        parent(options)
+
+
+if __name__ == '__main__':
+    main()
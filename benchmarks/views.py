@@ -0,0 +1,195 @@
+"""Нагрузочный прогон основных страниц через тестовый клиент Django.
+
+Работает с базой из настроек проекта, поэтому сначала её нужно заполнить:
+
+    python manage.py migrate
+    python manage.py generate_data --users 100 --news 1000 --comments 50000
+    python -m benchmarks.views --requests 200 --output bench.json
+    python -m benchmarks.views --compare bench.json
+
+Изменения базы, сделанные во время прогона, откатываются.
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from time import perf_counter, process_time
+
+from benchmarks import setup
+
+setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import transaction  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from news.models import Comment, News  # noqa: E402
+
+User = get_user_model()
+
+HOST = 'localhost'
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию прогона."""
+
+
+def measure(name, requests, prepare, send):
+    """
+    Выполняет ``send()`` заданное число раз.
+
+    ``prepare()`` готовит данные для очередного запроса и в замер
+    не входит.
+    """
+    latencies = []
+    queries = []
+    cpu = 0.0
+    for _ in range(requests):
+        argument = prepare()
+        start = perf_counter()
+        cpu_start = process_time()
+        response = send(argument)
+        cpu += process_time() - cpu_start
+        latencies.append(perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: ответ {response.status_code}')
+        queries.append(response.metrics.queries)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': requests,
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'rps': round(requests / sum(latencies), 1),
+        'cpu_ms': round(cpu / requests * 1000, 3),
+        'queries_mean': round(statistics.mean(queries), 2),
+        'queries_max': max(queries),
+    }
+
+
+def run(requests):
+    news = News.objects.order_by('-comment_count').first()
+    if news is None:
+        sys.exit('База пуста: сначала запустите manage.py generate_data.')
+    user = User.objects.order_by('pk').first()
+    anonymous = Client(HTTP_HOST=HOST)
+    author = Client(HTTP_HOST=HOST)
+    author.force_login(user)
+    home_url = reverse('news:home')
+    detail_url = reverse('news:detail', args=(news.pk,))
+    api_list_url = reverse('news:api_news_list')
+    api_detail_url = reverse('news:api_news_detail', args=(news.pk,))
+    api_comments_url = reverse('news:api_comments', args=(news.pk,))
+    own_comment = Comment.objects.create(
+        news=news, author=user, text='Комментарий для правки'
+    )
+    edit_url = reverse('news:edit', args=(own_comment.pk,))
+
+    def new_comment():
+        return Comment.objects.create(
+            news=news, author=user, text='Комментарий для удаления'
+        )
+
+    def nothing():
+        return None
+
+    scenarios = {
+        'home': (nothing, lambda _: anonymous.get(home_url)),
+        'detail': (nothing, lambda _: anonymous.get(detail_url)),
+        'detail_author': (nothing, lambda _: author.get(detail_url)),
+        'api_news_list': (nothing, lambda _: anonymous.get(api_list_url)),
+        'api_news_detail': (
+            nothing, lambda _: anonymous.get(api_detail_url),
+        ),
+        'api_comments': (nothing, lambda _: anonymous.get(api_comments_url)),
+        'comment_post': (
+            nothing,
+            lambda _: author.post(detail_url, {'text': 'Новый комментарий'}),
+        ),
+        'edit_get': (nothing, lambda _: author.get(edit_url)),
+        'edit_post': (
+            nothing, lambda _: author.post(edit_url, {'text': 'Правка'}),
+        ),
+        'delete_post': (
+            new_comment,
+            lambda comment: author.post(
+                reverse('news:delete', args=(comment.pk,))
+            ),
+        ),
+    }
+    return {
+        name: measure(name, requests, prepare, send)
+        for name, (prepare, send) in scenarios.items()
+    }
+
+
+def revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    print(f'{"сценарий":<16}{"p95 было":>12}{"p95 стало":>12}{"разница":>10}')
+    for name, result in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms']
+        print(
+            f'{name:<16}{before["p95_ms"]:>12.3f}'
+            f'{result["p95_ms"]:>12.3f}{change:>+10.1%}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--output', help='Куда сохранить результаты JSON.')
+    parser.add_argument('--compare', help='JSON предыдущего прогона.')
+    options = parser.parse_args()
+
+    # Построчный лог метрик на каждый запрос только исказил бы замер.
+    logging.getLogger('yanews.metrics').setLevel(logging.WARNING)
+    # Прогон пишет комментарии от одного пользователя подряд, и
+    # ограничение частоты отвечало бы ему 429.
+    settings.COMMENT_RATE_LIMITS = {}
+    scenarios = {}
+    try:
+        with transaction.atomic():
+            scenarios.update(run(options.requests))
+            raise Rollback
+    except Rollback:
+        pass
+    result = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': revision(),
+        'python': platform.python_version(),
+        'dataset': {
+            'users': User.objects.count(),
+            'news': News.objects.count(),
+            'comments': Comment.objects.count(),
+        },
+        'scenarios': scenarios,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as file:
+            compare(result, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
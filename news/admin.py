@@ -1,15 +1,214 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
-from .models import Comment, News
+from . import search
+from .models import BadWord, Comment, CommentStatus, News
+from .moderation import apply_decisions
 
+ADMIN_REJECT_NOTE = 'Отклонён модератором.'
 
-class CommentInline(admin.StackedInline):
-    model = Comment
-    extra = 0
+
+def estimated_count(queryset):
+    """
+    Оценка числа строк в таблице без фильтров по статистике базы.
+
+    В SQLite статистику собирает ``ANALYZE``; пока её нет, оценки нет.
+    """
+    if queryset.query.where:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [table],
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            # Первое число stat — строк в индексе; частичные индексы
+            # покрывают только часть таблицы, поэтому берётся максимум.
+            cursor.execute(
+                'SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 '
+                'WHERE tbl = %s',
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Для больших таблиц без фильтров — оценка вместо ``COUNT(*)``.
+
+    Отфильтрованный список считается точно: фильтры и иерархия дат
+    сужают его по индексам.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if (
+            estimate is not None
+            and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+        ):
+            return estimate
+        return super().count
+
+
+class NewsChangeList(ChangeList):
+    """
+    Список новостей без полных текстов; число комментариев на модерации —
+    одним сгруппированным запросом по новостям страницы.
+
+    Аннотация подзапросом в ``get_queryset`` попала бы и в ``COUNT(*)``
+    для пагинации, который Django 3.2 выполняет вместе с ней.
+    """
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('text', 'teaser')
+
+    def get_results(self, request):
+        super().get_results(request)
+        pending = dict(
+            Comment.objects.pending()
+            .filter(news__in=[news.pk for news in self.result_list])
+            .order_by()
+            .values_list('news')
+            .annotate(Count('pk'))
+        )
+        for news in self.result_list:
+            news.pending_count = pending.get(news.pk, 0)
 
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
-    inlines = [
-        CommentInline,
-    ]
+    """
+    Комментарии новости открываются отдельным отфильтрованным списком:
+    встроенные формы для тысяч комментариев не помещаются на страницу.
+    """
+    list_display = ('title', 'date', 'comments', 'pending_count')
+    date_hierarchy = 'date'
+    search_fields = ('title',)
+    fields = ('title', 'text', 'date', 'comments')
+    readonly_fields = ('comments',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return NewsChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу FTS5 вместо LIKE по всей таблице."""
+        if not search_term or not search.is_available(queryset.db):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        ids = search.matching_ids(
+            search.NEWS, search_term, settings.ADMIN_SEARCH_LIMIT,
+            using=queryset.db,
+        )
+        return queryset.filter(pk__in=ids), False
+
+    @admin.display(description='Комментарии', ordering='comment_count')
+    def comments(self, news):
+        url = reverse('admin:news_comment_changelist')
+        return format_html(
+            '<a href="{}?news__id__exact={}">{}</a>',
+            url, news.pk, news.comment_count,
+        )
+
+    @admin.display(description='На модерации')
+    def pending_count(self, news):
+        return news.pending_count
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    """
+    Модерация комментариев: фильтр по статусу (очередь — по частичному
+    индексу), поиск и массовые действия. Статус и новость меняются только
+    действиями, чтобы счётчики комментариев не разошлись.
+    """
+    list_display = ('__str__', 'news', 'author', 'created', 'status')
+    list_filter = ('status',)
+    list_select_related = ('news', 'author')
+    raw_id_fields = ('news', 'author')
+    search_fields = ('=author__username', 'text')
+    # Сортировка по первичному ключу не требует сортировки всей таблицы.
+    ordering = ('-id',)
+    actions = ('publish_comments', 'reject_comments')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer(
+            'news__text', 'news__teaser'
+        )
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return ()
+        return ('news', 'status', 'moderation_note')
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Опубликованные комментарии ищутся по индексу FTS5, остальные,
+        которых немного, — по тексту.
+        """
+        if not search_term or not search.is_available(queryset.db):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        ids = search.matching_ids(
+            search.COMMENT, search_term, settings.ADMIN_SEARCH_LIMIT,
+            using=queryset.db,
+        )
+        return queryset.filter(
+            Q(author__username=search_term)
+            | Q(pk__in=ids)
+            | (
+                ~Q(status=CommentStatus.PUBLISHED)
+                & Q(text__icontains=search_term)
+            )
+        ), False
+
+    @admin.action(description='Опубликовать выбранные комментарии')
+    def publish_comments(self, request, queryset):
+        comments = list(
+            queryset.exclude(status=CommentStatus.PUBLISHED)
+            .select_related('author')
+        )
+        # Изменённые с момента выборки, например воркером, пропускаются.
+        published, _ = apply_decisions(comments, [], {})
+        self.message_user(request, f'Опубликовано: {len(published)}.')
+
+    @admin.action(description='Отклонить выбранные комментарии')
+    def reject_comments(self, request, queryset):
+        comments = list(queryset.exclude(status=CommentStatus.REJECTED))
+        _, rejected = apply_decisions(
+            [], comments,
+            {comment.pk: ADMIN_REJECT_NOTE for comment in comments},
+        )
+        self.message_user(request, f'Отклонено: {len(rejected)}.')
+
+
+@admin.register(BadWord)
+class BadWordAdmin(admin.ModelAdmin):
+    search_fields = ('word',)
@@ -0,0 +1,156 @@
+"""JSON API только для чтения: новости и комментарии.
+
+Данные читаются через ``.values()``, без создания экземпляров моделей
+и без шаблонов. Клиент может выбрать поля параметром ``fields=``,
+страницы листаются курсорами ``after``/``before``, а ответы снабжены
+ETag из версий кэша, как и HTML-страницы.
+"""
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import generic
+from django.views.decorators.http import condition
+
+from .cache import news_list_version, news_version
+from .models import Comment, News
+from .pagination import AFTER, BEFORE, InvalidCursor, KeysetPaginator
+
+
+class ApiError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def news_list_etag(request, *args, **kwargs):
+    return f'api-{news_list_version()}'
+
+
+def news_etag(request, pk, **kwargs):
+    return f'api-{news_version(pk)}'
+
+
+class JsonApiView(generic.View):
+    """
+    Базовое представление API.
+
+    ``fields`` сопоставляет имена полей в ответе с путями в ORM,
+    ``default_fields`` — поля ответа без параметра ``fields=``.
+    """
+    fields = {}
+    default_fields = ()
+    ordering = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse(
+                {'detail': error.message}, status=error.status
+            )
+
+    def get_fields(self):
+        raw = self.request.GET.get('fields')
+        if not raw:
+            return list(self.default_fields)
+        names = list(dict.fromkeys(
+            name.strip() for name in raw.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ApiError(
+                400, f'Неизвестные поля: {", ".join(unknown) or raw}.'
+            )
+        return names
+
+    def get_values(self, queryset, names):
+        """Выбираем только нужные колонки и поля сортировки для курсора."""
+        lookups = [self.fields[name] for name in names]
+        lookups += [
+            field.lstrip('-') for field in self.ordering
+            if field.lstrip('-') not in lookups
+        ]
+        return queryset.values(*lookups)
+
+    def serialize(self, row, names):
+        return {name: row[self.fields[name]] for name in names}
+
+    def get_page(self, queryset, names):
+        paginator = KeysetPaginator(
+            self.get_values(queryset, names),
+            self.ordering,
+            settings.API_PAGE_SIZE,
+        )
+        before = self.request.GET.get(BEFORE)
+        after = self.request.GET.get(AFTER)
+        cursor, direction = (before, BEFORE) if before else (after, AFTER)
+        try:
+            page = paginator.page(cursor, direction)
+            return {
+                'results': [self.serialize(row, names) for row in page],
+                'previous': page.previous_cursor,
+                'next': page.next_cursor,
+            }
+        except InvalidCursor:
+            raise ApiError(400, 'Неверный курсор страницы.')
+
+
+NEWS_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'text': 'text',
+    'teaser': 'teaser',
+    'date': 'date',
+    'comment_count': 'comment_count',
+}
+
+
+@method_decorator(condition(etag_func=news_list_etag), name='get')
+class NewsListApi(JsonApiView):
+    """Новости от свежих к старым; по умолчанию без полного текста."""
+    fields = NEWS_FIELDS
+    default_fields = ('id', 'title', 'date', 'comment_count')
+    ordering = ('-date', '-id')
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(
+            self.get_page(News.objects.all(), self.get_fields())
+        )
+
+
+@method_decorator(condition(etag_func=news_etag), name='get')
+class NewsDetailApi(JsonApiView):
+    fields = NEWS_FIELDS
+    default_fields = tuple(NEWS_FIELDS)
+
+    def get(self, request, pk, **kwargs):
+        names = self.get_fields()
+        row = self.get_values(News.objects.filter(pk=pk), names).first()
+        if row is None:
+            raise ApiError(404, 'Новость не найдена.')
+        return JsonResponse(self.serialize(row, names))
+
+
+@method_decorator(condition(etag_func=news_etag), name='get')
+class CommentListApi(JsonApiView):
+    """Комментарии новости от старых к новым."""
+    fields = {
+        'id': 'id',
+        'text': 'text',
+        'created': 'created',
+        'author': 'author__username',
+    }
+    default_fields = ('id', 'text', 'created', 'author')
+    ordering = ('created', 'id')
+
+    def get(self, request, pk, **kwargs):
+        names = self.get_fields()
+        if not News.objects.filter(pk=pk).exists():
+            raise ApiError(404, 'Новость не найдена.')
+        return JsonResponse(
+            self.get_page(
+                Comment.objects.published().filter(news_id=pk), names
+            )
+        )
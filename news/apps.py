@@ -5,3 +5,11 @@ class NewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news'
     verbose_name = 'Новости'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import live, search, signals  # noqa: F401
+
+        post_migrate.connect(search.install_triggers, sender=self)
+        post_migrate.connect(live.install_triggers, sender=self)
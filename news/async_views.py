@@ -0,0 +1,57 @@
+"""Асинхронные варианты страниц новостей для запуска под ASGI.
+
+Django 3.2 выполняет синхронные представления под ASGI в одном общем
+потоке, так что один медленный запрос задерживает все остальные.
+Здесь представление целиком — сессия, база, кэш и отрисовка шаблона —
+выполняется в отдельном пуле потоков ограниченного размера, а цикл
+событий только ждёт готовый ответ. ORM из асинхронного кода не
+вызывается, поэтому ``SynchronousOnlyOperation`` исключена.
+
+Размер пула задаёт ``ASYNC_VIEW_WORKERS``: он же ограничивает число
+соединений с базой, открытых асинхронными страницами.
+"""
+from django.utils.decorators import classonlymethod
+
+from yanews.metrics import current_metrics, track_queries
+
+from . import views
+from .pool import in_pool
+
+
+def run_view(view, request, *args, **kwargs):
+    """Ответ отрисовывается здесь же, пока доступна база."""
+    with track_queries(current_metrics.get()):
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+    return response
+
+
+class AsyncViewMixin:
+    """Превращает представление в корутину, работающую через пул."""
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        run = in_pool(run_view)
+
+        async def async_view(request, *args, **kwargs):
+            return await run(view, request, *args, **kwargs)
+
+        async_view.view_class = view.view_class
+        async_view.view_initkwargs = view.view_initkwargs
+        async_view.__doc__ = view.__doc__
+        async_view.__module__ = view.__module__
+        return async_view
+
+
+class NewsList(AsyncViewMixin, views.NewsList):
+    pass
+
+
+class NewsArchive(AsyncViewMixin, views.NewsArchive):
+    pass
+
+
+class NewsDetailView(AsyncViewMixin, views.NewsDetailView):
+    pass
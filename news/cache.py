@@ -0,0 +1,126 @@
+"""Кэш фрагментов разметки с версиями, которые сбрасывают сигналы.
+
+Ключ фрагмента включает текущую версию, поэтому после изменения новостей
+или комментариев старые фрагменты просто перестают читаться и вытесняются
+кэшем сами. Версия списка новостей общая, версия страницы новости —
+своя у каждой новости, но не старше общей версии страниц, которую
+сдвигают массовые изменения новостей.
+
+Версия — это время последнего изменения в наносекундах, поэтому из неё же
+получаются валидаторы ETag и Last-Modified для условных GET-запросов.
+"""
+import hashlib
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from yanews.routers import is_pinned, require_version
+
+NEWS_LIST_VERSION_KEY = 'news:list:version'
+NEWS_VERSION_KEY = 'news:{pk}:version'
+NEWS_PAGES_VERSION_KEY = 'news:pages:version'
+
+# Попадания и промахи по фрагментам: stats['news_list', 'hits'].
+stats = Counter()
+
+
+def get_cache():
+    return caches[settings.NEWS_CACHE]
+
+
+def get_version(key):
+    # Если ключ версии вытеснят, новая версия всё равно окажется больше
+    # всех прежних и не совпадёт ни с одной из уже закэшированных.
+    version = get_cache().get_or_set(key, time.time_ns(), timeout=None)
+    # Разметка и валидаторы этой версии собираются из данных не старше её.
+    require_version(version)
+    return version
+
+
+def set_next_version(key):
+    cache = get_cache()
+    version = max(time.time_ns(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, timeout=None)
+
+
+def bump_version(key):
+    """
+    Сдвигает версию сразу и ещё раз после коммита.
+
+    Пока транзакция не закоммичена, параллельный читатель видит старые
+    данные, но уже новую версию и может закэшировать под ней устаревшую
+    разметку; повторный сдвиг после коммита её отбрасывает. Первый сдвиг
+    нужен коду внутри той же транзакции.
+    """
+    set_next_version(key)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: set_next_version(key))
+
+
+def bump_news_list_version():
+    bump_version(NEWS_LIST_VERSION_KEY)
+
+
+def bump_news_version(news_pk):
+    bump_version(NEWS_VERSION_KEY.format(pk=news_pk))
+
+
+def bump_news_pages_version():
+    """Сбрасывает страницы всех новостей сразу."""
+    bump_version(NEWS_PAGES_VERSION_KEY)
+
+
+def news_list_version():
+    return get_version(NEWS_LIST_VERSION_KEY)
+
+
+def news_version(news_pk):
+    return max(
+        get_version(NEWS_VERSION_KEY.format(pk=news_pk)),
+        get_version(NEWS_PAGES_VERSION_KEY),
+    )
+
+
+def version_to_datetime(version):
+    return datetime.fromtimestamp(version // 10**9, tz=timezone.utc)
+
+
+def get_or_render(name, version, key_parts, render):
+    """
+    Фрагмент из кэша или, при промахе, результат ``render()``.
+
+    Запрос, закреплённый за основной базой, всегда перерисовывает
+    фрагмент: закэшированный мог быть собран с отстающей реплики.
+    """
+    cache = get_cache()
+    digest = hashlib.md5(
+        '\x00'.join(str(part) for part in key_parts).encode()
+    ).hexdigest()
+    key = f'{name}:{version}:{digest}'
+    fragment = None if is_pinned() else cache.get(key)
+    if fragment is not None:
+        stats[name, 'hits'] += 1
+        return fragment
+    stats[name, 'misses'] += 1
+    fragment = render()
+    cache.set(key, fragment, settings.NEWS_CACHE_TIMEOUT)
+    return fragment
+
+
+def get_or_render_news_list(key_parts, render):
+    return get_or_render(
+        'news_list', news_list_version(), key_parts, render
+    )
+
+
+def get_or_render_comments(news_pk, key_parts, render):
+    return get_or_render(
+        'comments',
+        news_version(news_pk),
+        (news_pk, *key_parts),
+        render,
+    )
@@ -0,0 +1,142 @@
+"""Потоковая выгрузка новостей и комментариев в NDJSON и CSV.
+
+Строки читаются из базы пачками через ``.iterator()`` и сразу
+превращаются в текст, поэтому расход памяти не зависит от размера таблиц.
+"""
+import csv
+import json
+import zlib
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, News
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = {
+    NDJSON: 'application/x-ndjson',
+    CSV: 'text/csv',
+}
+
+# Для каждой выгрузки: поля в ответе, пути в ORM, поле отметки «since»
+# и лукап, которым отметка сравнивается.
+EXPORTS = {
+    'news': {
+        'model': News,
+        'fields': {
+            'id': 'id',
+            'title': 'title',
+            'text': 'text',
+            'date': 'date',
+            'comment_count': 'comment_count',
+        },
+        'since': 'date__gte',
+    },
+    'comments': {
+        'model': Comment,
+        'fields': {
+            'id': 'id',
+            'news_id': 'news_id',
+            'author': 'author__username',
+            'text': 'text',
+            'created': 'created',
+            'status': 'status',
+        },
+        'since': 'created__gt',
+    },
+}
+
+
+class ExportError(ValueError):
+    """Неверные параметры выгрузки."""
+
+
+def parse_since(kind, value):
+    """Отметка ``since``: дата для новостей, момент для комментариев."""
+    if not value:
+        return None
+    if kind == 'news':
+        since = parse_date(value)
+    else:
+        since = parse_datetime(value)
+        if since is None and parse_date(value) is not None:
+            since = datetime.combine(parse_date(value), time.min)
+        if since is not None and timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    if since is None:
+        raise ExportError(f'Не удалось разобрать отметку since: {value}')
+    return since
+
+
+def export_rows(kind, since=None, chunk_size=2000):
+    """Кортежи значений в порядке первичного ключа."""
+    try:
+        export = EXPORTS[kind]
+    except KeyError:
+        raise ExportError(f'Неизвестная выгрузка: {kind}')
+    queryset = export['model'].objects.order_by('pk')
+    if since is not None:
+        queryset = queryset.filter(**{export['since']: since})
+    return queryset.values_list(*export['fields'].values()).iterator(
+        chunk_size=chunk_size
+    )
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def render(kind, rows, output_format):
+    """Строки выгрузки в выбранном формате, по одной записи за раз."""
+    names = list(EXPORTS[kind]['fields'])
+    if output_format == NDJSON:
+        for row in rows:
+            # Полная точность времени: отметки since не должны терять
+            # микросекунды, иначе последняя строка выгрузится повторно.
+            yield json.dumps(
+                dict(zip(names, row)),
+                ensure_ascii=False,
+                default=lambda value: value.isoformat(),
+            ) + '\n'
+    elif output_format == CSV:
+        writer = csv.writer(Echo())
+        yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        raise ExportError(f'Неизвестный формат: {output_format}')
+
+
+def gzip_stream(chunks, buffer_size=64 * 1024):
+    """Сжимает поток строк в gzip, отдавая сжатые блоки по мере готовности."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            compressed = compressor.compress(b''.join(buffer))
+            buffer, size = [], 0
+            if compressed:
+                yield compressed
+    yield compressor.compress(b''.join(buffer)) + compressor.flush()
+
+
+def export(kind, output_format=NDJSON, since=None, compress=False,
+           chunk_size=2000):
+    """Итератор готовых к записи кусков: строк или байтов при сжатии."""
+    if output_format not in FORMATS:
+        raise ExportError(f'Неизвестный формат: {output_format}')
+    chunks = render(
+        kind,
+        export_rows(kind, parse_since(kind, since), chunk_size),
+        output_format,
+    )
+    return gzip_stream(chunks) if compress else chunks
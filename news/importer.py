@@ -0,0 +1,224 @@
+"""Массовый импорт новостей из лент в NDJSON и CSV.
+
+Файл читается потоком, строки проверяются без форм — по тем же
+ограничениям, что заданы в модели, — и записываются пачками
+``bulk_create``, каждая в своей транзакции. Дубликаты по естественному
+ключу (заголовок и дата) отбрасываются как внутри пачки, так и против
+уже сохранённых новостей.
+"""
+import csv
+import gzip
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+from multiprocessing import Pool
+from time import perf_counter
+
+import django
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from .models import News, make_teaser
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+TITLE_MAX_LENGTH = News._meta.get_field('title').max_length
+# Сколько ошибок в строках помнить для отчёта.
+MAX_REPORTED_ERRORS = 20
+
+
+class RowError(ValueError):
+    """Строка ленты не прошла проверку."""
+
+
+def detect_format(path):
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-len('.gz')]
+    if name.endswith(('.ndjson', '.jsonl')):
+        return NDJSON
+    if name.endswith('.csv'):
+        return CSV
+    raise RowError(f'Не удалось определить формат файла {path}.')
+
+
+def open_feed(path):
+    if path.lower().endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_records(file, feed_format):
+    """
+    Пары (номер строки, запись): для NDJSON — строка, для CSV — словарь.
+
+    Разбор CSV остаётся здесь, потому что поле в кавычках может
+    занимать несколько строк файла.
+    """
+    if feed_format == NDJSON:
+        for number, line in enumerate(file, start=1):
+            if line.strip():
+                yield number, line
+    else:
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def parse_record(record):
+    """Словарь полей: запись CSV уже словарь, строку NDJSON разбираем."""
+    if not isinstance(record, str):
+        return record
+    try:
+        record = json.loads(record)
+    except ValueError as error:
+        raise RowError(f'неверный JSON: {error}')
+    if not isinstance(record, dict):
+        raise RowError('ожидается JSON-объект')
+    return record
+
+
+def clean_string(record, name, label):
+    """Непустая строка из поля ``name``; в JSON там может быть что угодно."""
+    value = record.get(name)
+    if value is not None and not isinstance(value, str):
+        raise RowError(f'{label} должен быть строкой')
+    value = (value or '').strip()
+    if not value:
+        raise RowError(f'пустой {label}')
+    return value
+
+
+def clean_title(record):
+    title = clean_string(record, 'title', 'заголовок')
+    if len(title) > TITLE_MAX_LENGTH:
+        raise RowError(
+            f'заголовок длиннее {TITLE_MAX_LENGTH} символов'
+        )
+    return title
+
+
+def clean_date(record):
+    """Дата в формате ГГГГ-ММ-ДД; без неё — сегодняшняя."""
+    raw_date = record.get('date')
+    if not raw_date:
+        return date.today()
+    try:
+        news_date = parse_date(raw_date) if isinstance(raw_date, str) else None
+    except ValueError:
+        news_date = None
+    if news_date is None:
+        raise RowError(f'неверная дата {raw_date!r}')
+    return news_date
+
+
+def clean(record):
+    """Проверенные поля новости из записи ленты."""
+    record = parse_record(record)
+    title = clean_title(record)
+    text = clean_string(record, 'text', 'текст')
+    news_date = clean_date(record)
+    # Анонс считаем здесь, чтобы при --workers он строился в пуле.
+    return {
+        'title': title,
+        'text': text,
+        'teaser': make_teaser(text),
+        'date': news_date,
+    }
+
+
+def clean_chunk(chunk):
+    """Проверяет пачку записей; выполняется и в процессах пула."""
+    cleaned = []
+    for number, record in chunk:
+        try:
+            cleaned.append((number, clean(record), None))
+        except RowError as error:
+            cleaned.append((number, None, str(error)))
+    return cleaned
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.seconds if self.seconds else 0.0
+
+
+def save_batch(rows, stats):
+    """Сохраняет пачку, отбросив уже известные новости."""
+    unique = {}
+    for row in rows:
+        unique.setdefault((row['title'], row['date']), row)
+    stats.duplicates += len(rows) - len(unique)
+    with transaction.atomic():
+        # Отбор только по заголовку идёт по индексу (title, date);
+        # с условием на дату SQLite предпочёл бы менее избирательный индекс.
+        existing = set(
+            News.objects.filter(
+                title__in={title for title, _ in unique}
+            ).values_list('title', 'date')
+        )
+        fresh = [
+            News(**row) for key, row in unique.items()
+            if key not in existing
+        ]
+        News.objects.bulk_create(fresh)
+    stats.duplicates += len(unique) - len(fresh)
+    stats.created += len(fresh)
+
+
+def import_news(path, feed_format=None, batch_size=2000, workers=0,
+                progress=None):
+    """
+    Импортирует ленту и возвращает статистику.
+
+    При ``workers > 0`` записи проверяются в пуле процессов, а запись в
+    базу остаётся в основном процессе: у SQLite всё равно один писатель.
+    """
+    feed_format = feed_format or detect_format(path)
+    stats = ImportStats()
+    start = perf_counter()
+    with open_feed(path) as file:
+        chunks = chunked(read_records(file, feed_format), batch_size)
+        pool = Pool(workers, initializer=django.setup) if workers else None
+        try:
+            cleaned_chunks = (
+                pool.imap(clean_chunk, chunks) if pool
+                else map(clean_chunk, chunks)
+            )
+            for cleaned in cleaned_chunks:
+                rows = []
+                for number, row, error in cleaned:
+                    stats.read += 1
+                    if error is None:
+                        rows.append(row)
+                        continue
+                    stats.invalid += 1
+                    if len(stats.errors) < MAX_REPORTED_ERRORS:
+                        stats.errors.append(f'строка {number}: {error}')
+                if rows:
+                    save_batch(rows, stats)
+                if progress:
+                    stats.seconds = perf_counter() - start
+                    progress(stats)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+    stats.seconds = perf_counter() - start
+    return stats
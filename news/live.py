@@ -0,0 +1,369 @@
+"""Новые комментарии в реальном времени через Server-Sent Events.
+
+Читатель страницы новости держит открытым одно соединение
+``/news/<pk>/events/``, а сервер присылает в него каждый новый
+комментарий уже отрисованным. Поток событий обслуживается прямо на
+уровне ASGI (:class:`LiveComments` оборачивает приложение Django в
+``yanews/asgi.py``): Django 3.2 не умеет отдавать асинхронные
+потоковые ответы, а синхронный генератор занял бы поток на всё время
+соединения. Ожидающий читатель стоит одну корутину и очередь.
+
+Комментарии раздаёт брокер из ``settings.LIVE_BROKER``:
+
+* :class:`LocalBroker` — в пределах процесса; годится для одного
+  воркера и для разработки;
+* :class:`PollingBroker` — ещё и комментарии из других процессов:
+  опрашивает таблицу комментариев по тем новостям, которые сейчас
+  кто-то читает. Это локальная замена внешней шины вроде Redis pub/sub
+  с тем же интерфейсом.
+
+Идентификатор события — номер публикации комментария
+(``Comment.published_seq``), а не его id: комментарий, одобренный
+модератором, публикуется позже более новых. Номера ставят триггеры
+SQLite (:func:`install_triggers`) при каждой публикации, в порядке
+коммитов, потому что пишет в базу одно соединение за раз.
+
+Переподключившийся клиент присылает ``Last-Event-ID`` — пропущенные
+комментарии досылаются из базы пачками по ``LIVE_REPLAY_LIMIT``, сколько
+бы их ни было, так что переполнение очереди или обрыв соединения ничего
+не теряют.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+
+from .models import Comment, CommentStatus, News
+from .pool import in_pool
+
+EVENTS_URL_NAME = 'news:events'
+
+NEXT_PUBLISHED_SEQ = (
+    'UPDATE news_comment SET published_seq = ('
+    'SELECT coalesce(max(published_seq), 0) + 1 FROM news_comment'
+    ') WHERE id = new.id;'
+)
+PUBLISHED = f'new.status = {CommentStatus.PUBLISHED}'
+
+TRIGGERS_SQL = (
+    'CREATE TRIGGER IF NOT EXISTS news_comment_publish_insert '
+    f'AFTER INSERT ON news_comment WHEN {PUBLISHED} '
+    f'BEGIN {NEXT_PUBLISHED_SEQ} END',
+    'CREATE TRIGGER IF NOT EXISTS news_comment_publish_update '
+    f'AFTER UPDATE OF status ON news_comment '
+    f'WHEN {PUBLISHED} AND old.status != new.status '
+    f'BEGIN {NEXT_PUBLISHED_SEQ} END',
+)
+
+
+def install_triggers(using='default', **kwargs):
+    """Ставит недостающие триггеры; подключён к сигналу post_migrate."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in TRIGGERS_SQL:
+            cursor.execute(statement)
+
+
+def comment_event(comment):
+    """Событие с готовой разметкой комментария."""
+    return {
+        'id': comment.published_seq,
+        'html': render_to_string(
+            'includes/comment.html', {'comment': comment}
+        ),
+    }
+
+
+def format_event(event):
+    return (
+        f'id: {event["id"]}\n'
+        'event: comment\n'
+        f'data: {json.dumps(event, ensure_ascii=False)}\n\n'
+    ).encode()
+
+
+class Subscription:
+    """Очередь событий одного читателя в цикле событий его соединения."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.LIVE_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Медленный читатель переподключится и дочитает из базы.
+            self.overflowed = True
+
+
+class LocalBroker:
+    """Рассылка событий подписчикам внутри процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = Subscription(channel)
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            channel = self.subscriptions[subscription.channel]
+            channel.discard(subscription)
+            if not channel:
+                del self.subscriptions[subscription.channel]
+
+    def channels(self):
+        with self.lock:
+            return list(self.subscriptions)
+
+    def has_subscribers(self, channel):
+        with self.lock:
+            return channel in self.subscriptions
+
+    def publish(self, channel, event):
+        """Можно вызывать из любого потока."""
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(
+                subscription.deliver, event
+            )
+
+
+def load_comment_events(channels, last_id):
+    comments = (
+        Comment.objects.published()
+        .filter(news__in=channels, published_seq__gt=last_id)
+        .select_related('author')
+        .order_by('published_seq')
+    )
+    return [
+        (comment.news_id, comment_event(comment)) for comment in comments
+    ]
+
+
+def latest_published_seq():
+    return (
+        Comment.objects.published()
+        .order_by('-published_seq')
+        .values_list('published_seq', flat=True)
+        .first()
+    )
+
+
+class PollingBroker(LocalBroker):
+    """
+    Локальная замена межпроцессной шины.
+
+    Пока в процессе есть подписчики, раз в ``LIVE_POLL_INTERVAL`` секунд
+    одним запросом выбираются новые комментарии к читаемым новостям,
+    откуда бы они ни пришли. Свои комментарии процесс рассылает сразу,
+    а повторы отсеивает поток событий читателя.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.poller = None
+
+    def subscribe(self, channel):
+        subscription = super().subscribe(channel)
+        loop = subscription.loop
+        if (
+            self.poller is None
+            or self.poller.done()
+            or self.poller.get_loop() is not loop
+        ):
+            self.poller = loop.create_task(self.poll())
+        return subscription
+
+    async def poll(self):
+        last_id = await in_pool(latest_published_seq)() or 0
+        while True:
+            await asyncio.sleep(settings.LIVE_POLL_INTERVAL)
+            channels = self.channels()
+            if not channels:
+                return
+            events = await in_pool(load_comment_events)(channels, last_id)
+            for channel, event in events:
+                last_id = max(last_id, event['id'])
+                self.publish(channel, event)
+
+
+broker = import_string(settings.LIVE_BROKER)()
+
+
+def publish_comments(comments):
+    """
+    Рассылает только что опубликованные комментарии; после коммита.
+
+    Комментарии к новостям, которые сейчас никто не читает, не
+    отрисовываются и не читаются из базы.
+    """
+    comments = [
+        comment for comment in comments
+        if broker.has_subscribers(comment.news_id)
+    ]
+    if not comments:
+        return
+    published_seqs = dict(
+        Comment.objects.published()
+        .filter(pk__in=[comment.pk for comment in comments])
+        .values_list('pk', 'published_seq')
+    )
+    for comment in comments:
+        comment.published_seq = published_seqs.get(comment.pk)
+        if comment.published_seq is not None:
+            broker.publish(comment.news_id, comment_event(comment))
+
+
+def replay(news_pk, last_id):
+    """
+    Первые ``LIVE_REPLAY_LIMIT`` комментариев, опубликованных после
+    ``last_id``, если новость есть. Полная пачка значит, что за ней
+    могут быть ещё.
+    """
+    if not News.objects.filter(pk=news_pk).exists():
+        return None
+    comments = (
+        Comment.objects.published()
+        .filter(news=news_pk, published_seq__gt=last_id)
+        .select_related('author')
+        .order_by('published_seq')[:settings.LIVE_REPLAY_LIMIT]
+    )
+    return [comment_event(comment) for comment in comments]
+
+
+class LiveComments:
+    """ASGI-обёртка, обслуживающая поток событий страницы новости."""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            try:
+                match = resolve(scope['path'])
+            except Resolver404:
+                match = None
+            if match is not None and match.view_name == EVENTS_URL_NAME:
+                return await self.stream(
+                    scope, receive, send, match.kwargs['pk']
+                )
+        return await self.application(scope, receive, send)
+
+    @staticmethod
+    def get_last_id(scope):
+        """
+        Последний полученный комментарий.
+
+        Страница передаёт его параметром ``last_id``, а при
+        переподключении браузер сам присылает ``Last-Event-ID``.
+        """
+        value = dict(scope['headers']).get(b'last-event-id', b'').decode()
+        if not value:
+            query = parse_qs(scope.get('query_string', b'').decode())
+            value = query.get('last_id', [''])[-1]
+        return int(value) if value.isdigit() else 0
+
+    async def stream(self, scope, receive, send, pk):
+        message = await receive()
+        while message.get('more_body'):
+            message = await receive()
+        subscription = broker.subscribe(pk)
+        try:
+            last_id = self.get_last_id(scope)
+            events = await in_pool(replay)(pk, last_id)
+            if events is None:
+                await send({
+                    'type': 'http.response.start',
+                    'status': 404,
+                    'headers': [(b'content-type', b'text/plain')],
+                })
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            retry = settings.LIVE_RETRY * 1000
+            await send({
+                'type': 'http.response.body',
+                'body': f'retry: {retry}\n\n'.encode(),
+                'more_body': True,
+            })
+            await self.pump(subscription, pk, last_id, events, receive, send)
+        finally:
+            broker.unsubscribe(subscription)
+
+    @staticmethod
+    async def send_events(events, last_id, send):
+        """
+        Шлёт события новее ``last_id`` и возвращает последний номер.
+
+        Номера публикации растут, поэтому повтор — комментарий, который
+        и разослал сам процесс, и нашёл опрос базы, — не новее уже
+        отправленного.
+        """
+        for event in events:
+            if event['id'] <= last_id:
+                continue
+            last_id = event['id']
+            await send({
+                'type': 'http.response.body',
+                'body': format_event(event),
+                'more_body': True,
+            })
+        return last_id
+
+    async def pump(self, subscription, pk, last_id, events, receive, send):
+        """Дочитывает пропущенное, затем шлёт события до отключения."""
+        disconnect = asyncio.ensure_future(receive())
+        try:
+            while len(events) >= settings.LIVE_REPLAY_LIMIT:
+                last_id = await self.send_events(events, last_id, send)
+                events = await in_pool(replay)(pk, last_id) or []
+            while not subscription.overflowed:
+                last_id = await self.send_events(events, last_id, send)
+                next_event = asyncio.ensure_future(subscription.queue.get())
+                done, _ = await asyncio.wait(
+                    (next_event, disconnect),
+                    timeout=settings.LIVE_HEARTBEAT,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect in done:
+                    next_event.cancel()
+                    return
+                if next_event in done:
+                    events = [next_event.result()]
+                else:
+                    next_event.cancel()
+                    events = []
+                    await send({
+                        'type': 'http.response.body',
+                        'body': b': ping\n\n',
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnect.cancel()
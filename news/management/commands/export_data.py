@@ -0,0 +1,54 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from news.export import CSV, EXPORTS, NDJSON, ExportError, export
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает новости или комментарии в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=tuple(EXPORTS))
+        parser.add_argument(
+            '--format', choices=(NDJSON, CSV), default=NDJSON
+        )
+        parser.add_argument(
+            '--since',
+            help=(
+                'Выгрузить только новое: дата новостей (включительно) '
+                'или момент создания комментариев (строго позже).'
+            ),
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        try:
+            chunks = export(
+                options['kind'],
+                options['format'],
+                since=options['since'],
+                compress=options['gzip'],
+                chunk_size=options['chunk_size'],
+            )
+        except ExportError as error:
+            raise CommandError(error)
+        output = options['output']
+        if output and options['gzip']:
+            with open(output, 'wb') as file:
+                file.writelines(chunks)
+        elif output:
+            with open(output, 'w', encoding='utf-8', newline='') as file:
+                file.writelines(chunks)
+        elif options['gzip']:
+            sys.stdout.buffer.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,118 @@
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.models import Comment, News
+
+User = get_user_model()
+
+WORDS = (
+    'новость', 'город', 'погода', 'выборы', 'спорт', 'футбол', 'курс',
+    'рубль', 'наука', 'космос', 'театр', 'премьера', 'дорога', 'пробка',
+    'школа', 'экзамен', 'лето', 'зима', 'рынок', 'цены', 'концерт',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетические данные для нагрузочных тестов: '
+        'пользователей, новости и комментарии, распределённые по Ципфу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа комментариев по новостям.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        prefix = options['prefix']
+        with transaction.atomic():
+            password = make_password(None)
+            User.objects.bulk_create(
+                (
+                    User(username=f'{prefix}_{index}', password=password)
+                    for index in range(options['users'])
+                ),
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            user_ids = list(
+                User.objects.filter(username__startswith=f'{prefix}_')
+                .values_list('pk', flat=True)
+            )
+            today = date.today()
+            News.objects.bulk_create(
+                (
+                    News(
+                        title=f'{prefix} {index}: {self.sentence(rng, 3)}'[
+                            :50
+                        ],
+                        text=self.sentence(rng, rng.randint(20, 200)),
+                        date=today - timedelta(days=index // 5),
+                    )
+                    for index in range(options['news'])
+                ),
+                batch_size=batch_size,
+            )
+            news_ids = list(
+                News.objects.filter(title__startswith=f'{prefix} ')
+                .order_by('-date', '-id')
+                .values_list('pk', flat=True)[:options['news']]
+            )
+            per_news = self.zipf_counts(
+                rng, len(news_ids), options['comments'], options['zipf']
+            )
+            # Комментарии создаются новость за новостью, чтобы каждая
+            # пачка обновляла счётчики лишь у нескольких новостей.
+            batch = []
+            for news_id, amount in zip(news_ids, per_news):
+                for _ in range(amount):
+                    batch.append(Comment(
+                        news_id=news_id,
+                        author_id=rng.choice(user_ids),
+                        text=self.sentence(rng, rng.randint(3, 40)),
+                    ))
+                    if len(batch) >= batch_size:
+                        Comment.objects.bulk_create(batch)
+                        batch = []
+            Comment.objects.bulk_create(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {options["users"]}, '
+            f'новостей: {len(news_ids)}, '
+            f'комментариев: {sum(per_news)}.'
+        ))
+
+    @staticmethod
+    def sentence(rng, length):
+        return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+    @staticmethod
+    def zipf_counts(rng, buckets, total, exponent):
+        """Сколько комментариев достанется каждой новости по рангу."""
+        if not buckets:
+            return []
+        weights = accumulate(
+            1 / rank ** exponent for rank in range(1, buckets + 1)
+        )
+        counts = [0] * buckets
+        for index in rng.choices(
+            range(buckets), cum_weights=list(weights), k=total
+        ):
+            counts[index] += 1
+        return counts
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news.importer import CSV, NDJSON, RowError, import_news
+
+
+class Command(BaseCommand):
+    help = 'Массово импортирует новости из файла NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл ленты; поддерживается сжатие gzip (.gz).'
+        )
+        parser.add_argument(
+            '--format',
+            choices=(NDJSON, CSV),
+            help='Формат ленты, если его не видно по расширению.',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Сколько процессов проверяют строки; 0 — без пула.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            stats = import_news(
+                options['path'],
+                feed_format=options['format'],
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                progress=self.progress if options['verbosity'] > 1 else None,
+            )
+        except (OSError, RowError) as error:
+            raise CommandError(error)
+        for error in stats.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {stats.read}, создано новостей: '
+            f'{stats.created}, дубликатов: {stats.duplicates}, '
+            f'с ошибками: {stats.invalid}. '
+            f'{stats.rows_per_second:.0f} строк/с.'
+        ))
+
+    def progress(self, stats):
+        self.stdout.write(
+            f'{stats.read} строк, {stats.rows_per_second:.0f} строк/с'
+        )
@@ -0,0 +1,50 @@
+from time import sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from news.moderation import ModerationStats, moderate_batch
+
+
+class Command(BaseCommand):
+    help = 'Воркер модерации: проверяет и публикует ожидающие комментарии.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и завершиться.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.COMMENT_MODERATION_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.COMMENT_MODERATION_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+
+    def handle(self, *args, **options):
+        stats = ModerationStats()
+        try:
+            while True:
+                processed = moderate_batch(stats, options['batch_size'])
+                if processed and options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'Пачка {stats.batches}: {processed} комментариев, '
+                        f'задержка {stats.last_lag:.1f} с, '
+                        f'{stats.throughput:.0f} комментариев/с'
+                    )
+                if not processed:
+                    if options['once']:
+                        break
+                    sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f'Опубликовано: {stats.published}, '
+            f'отклонено: {stats.rejected}.'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс новостей и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if not search.is_available(options['database']):
+            raise CommandError(
+                'Поиск работает только на SQLite с применёнными миграциями.'
+            )
+        search.rebuild(options['database'])
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from news.models import Comment, News
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает или проверяет счётчики комментариев у новостей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счётчики, ничего не изменяя.',
+        )
+
+    def handle(self, *args, **options):
+        actual = Coalesce(
+            Subquery(
+                Comment.objects.published()
+                .filter(news=OuterRef('pk'))
+                .order_by()
+                .values('news')
+                .annotate(total=Count('pk'))
+                .values('total'),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+        if options['check']:
+            broken = (
+                News.objects.annotate(actual=actual)
+                .exclude(comment_count=actual)
+                .values_list('pk', 'comment_count', 'actual')
+            )
+            mismatches = 0
+            for pk, stored, real in broken.iterator():
+                mismatches += 1
+                self.stdout.write(
+                    f'Новость {pk}: сохранено {stored}, на самом деле {real}'
+                )
+            if mismatches:
+                raise CommandError(
+                    f'Неверных счётчиков: {mismatches}. '
+                    'Запустите команду без --check, чтобы исправить их.'
+                )
+            self.stdout.write(self.style.SUCCESS('Все счётчики верны.'))
+            return
+        updated = News.objects.update(comment_count=actual)
+        self.stdout.write(
+            self.style.SUCCESS(f'Счётчики пересчитаны у новостей: {updated}.')
+        )
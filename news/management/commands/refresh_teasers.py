@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from news.models import News, make_teaser
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает анонсы новостей, например после изменения '
+        'NEWS_TEASER_WORDS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Сколько новостей обновлять одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch = []
+        updated = 0
+        news_list = News.objects.only('pk', 'text', 'teaser')
+        for news in news_list.iterator(batch_size):
+            teaser = make_teaser(news.text)
+            if teaser == news.teaser:
+                continue
+            news.teaser = teaser
+            batch.append(news)
+            updated += 1
+            if len(batch) == batch_size:
+                News.objects.bulk_update(batch, ['teaser'])
+                batch = []
+        if batch:
+            News.objects.bulk_update(batch, ['teaser'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Анонсы обновлены у новостей: {updated}.')
+        )
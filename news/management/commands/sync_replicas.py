@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yanews.routers import sync_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплики из DATABASE_REPLICAS — '
+        'локальная замена репликации.'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте YANEWS_DB_REPLICA.'
+            )
+        sync_replicas()
+        self.stdout.write(self.style.SUCCESS(
+            f'Реплики обновлены: {", ".join(settings.DATABASE_REPLICAS)}.'
+        ))
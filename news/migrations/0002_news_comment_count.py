@@ -0,0 +1,44 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:56
+
+import datetime
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_count(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    Comment = apps.get_model('news', 'Comment')
+    News.objects.update(
+        comment_count=Coalesce(
+            models.Subquery(
+                Comment.objects.filter(news=models.OuterRef('pk'))
+                .order_by()
+                .values('news')
+                .annotate(total=models.Count('pk'))
+                .values('total'),
+                output_field=models.IntegerField(),
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.AlterField(
+            model_name='news',
+            name='date',
+            field=models.DateField(default=datetime.datetime.today),
+        ),
+        migrations.RunPython(fill_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# Новость хранится в строке rowid = 2 * id, комментарий — 2 * id + 1.
+# Буква «ё» приводится к «е», чтобы находились оба написания.
+# Триггеры, которые поддерживают таблицу в актуальном виде, ставит
+# news.search.install_triggers после каждой миграции: SQLite теряет их,
+# когда миграция пересоздаёт таблицу новостей или комментариев.
+CREATE_SQL = (
+    """
+    CREATE VIRTUAL TABLE news_search USING fts5(
+        title,
+        body,
+        news_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """,
+    "INSERT INTO news_search(news_search, rank) VALUES ('rank', 'bm25(10.0, 1.0, 0.0)')",
+    """
+    INSERT INTO news_search(rowid, title, body, news_id)
+    SELECT
+        id * 2,
+        replace(replace(title, 'ё', 'е'), 'Ё', 'Е'),
+        replace(replace(text, 'ё', 'е'), 'Ё', 'Е'),
+        id
+    FROM news_news
+    """,
+    """
+    INSERT INTO news_search(rowid, title, body, news_id)
+    SELECT
+        id * 2 + 1, '', replace(replace(text, 'ё', 'е'), 'Ё', 'Е'), news_id
+    FROM news_comment
+    """,
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS news_search_news_insert',
+    'DROP TRIGGER IF EXISTS news_search_news_update',
+    'DROP TRIGGER IF EXISTS news_search_news_delete',
+    'DROP TRIGGER IF EXISTS news_search_comment_insert',
+    'DROP TRIGGER IF EXISTS news_search_comment_update',
+    'DROP TRIGGER IF EXISTS news_search_comment_delete',
+    'DROP TABLE IF EXISTS news_search',
+)
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_badword'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)
+        ),
+    ]
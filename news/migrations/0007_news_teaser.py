@@ -0,0 +1,37 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH_SIZE = 2000
+
+
+def fill_teasers(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    batch = []
+    for news in News.objects.only('pk', 'text').iterator(BATCH_SIZE):
+        news.teaser = Truncator(news.text).words(
+            settings.NEWS_TEASER_WORDS, truncate=' …'
+        )
+        batch.append(news)
+        if len(batch) == BATCH_SIZE:
+            News.objects.bulk_update(batch, ['teaser'])
+            batch = []
+    News.objects.bulk_update(batch, ['teaser'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_news_title_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='teaser',
+            field=models.TextField(blank=True, editable=False, verbose_name='Анонс'),
+        ),
+        migrations.RunPython(fill_teasers, migrations.RunPython.noop),
+    ]
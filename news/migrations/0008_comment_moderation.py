@@ -0,0 +1,41 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:39
+
+from django.db import migrations, models
+
+
+def drop_comment_triggers(apps, schema_editor):
+    """
+    Триггеры поиска теперь пропускают неопубликованные комментарии.
+
+    Старые удаляются, а новые ставит news.search.install_triggers
+    после миграций.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in ('news_search_comment_insert', 'news_search_comment_update'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_news_teaser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='moderation_note',
+            field=models.CharField(blank=True, max_length=200, verbose_name='Причина отклонения'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Опубликован'), (2, 'На модерации'), (3, 'Отклонён')], default=1, verbose_name='Статус'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('status', 2)), fields=['id'], name='comment_pending_idx'),
+        ),
+        migrations.RunPython(drop_comment_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_comment_moderation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('status', 2)), fields=['news'], name='comment_pending_news_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:41
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_published(apps, schema_editor):
+    """
+    Уже опубликованные комментарии нумеруются по id.
+
+    Дальше номера ставят триггеры news.live.install_triggers: каждый
+    следующий на единицу больше наибольшего из уже выданных.
+    """
+    Comment = apps.get_model('news', 'Comment')
+    Comment.objects.filter(status=1).update(published_seq=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0010_comment_author_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='published_seq',
+            field=models.PositiveBigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['published_seq'], name='comment_published_seq_idx'),
+        ),
+        migrations.RunPython(number_published, migrations.RunPython.noop),
+    ]
@@ -1,22 +1,123 @@
+from collections import Counter
 from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.utils.text import Truncator
+
+from .cache import (
+    bump_news_list_version,
+    bump_news_pages_version,
+    bump_news_version,
+)
+
+
+def make_teaser(text):
+    """Анонс новости: то же, что фильтр truncatewords в шаблоне."""
+    return Truncator(text).words(settings.NEWS_TEASER_WORDS, truncate=' …')
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Массовые операции тоже должны сбрасывать кэш списка.
+
+        save() здесь не вызывается, поэтому недостающие анонсы
+        заполняем сами.
+        """
+        objs = list(objs)
+        for obj in objs:
+            if not obj.teaser:
+                obj.teaser = make_teaser(obj.text)
+        objs = super().bulk_create(objs, *args, **kwargs)
+        bump_news_list_version()
+        return objs
+
+    def update(self, **kwargs):
+        """
+        Какие новости изменились, неизвестно без лишнего запроса,
+        поэтому сбрасываются страницы всех новостей.
+        """
+        rows = super().update(**kwargs)
+        bump_news_list_version()
+        bump_news_pages_version()
+        return rows
+
+    def change_comment_count(self, amount):
+        """
+        Сдвигает счётчик комментариев. Версии разметки сбрасывает тот,
+        кто изменил сами комментарии.
+        """
+        return super().update(
+            comment_count=models.F('comment_count') + amount
+        )
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
+    teaser = models.TextField('Анонс', blank=True, editable=False)
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('date', 'id'), name='news_date_id_idx'),
+            # Естественный ключ, по которому импорт ищет дубликаты.
+            models.Index(fields=('title', 'date'), name='news_title_date_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.teaser = make_teaser(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'teaser'}
+        super().save(*args, **kwargs)
+
+
+class CommentStatus(models.IntegerChoices):
+    PUBLISHED = 1, 'Опубликован'
+    PENDING = 2, 'На модерации'
+    REJECTED = 3, 'Отклонён'
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def published(self):
+        return self.filter(status=CommentStatus.PUBLISHED)
+
+    def pending(self):
+        return self.filter(status=CommentStatus.PENDING)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Массовое создание не отправляет сигналы, поэтому счётчики
+        комментариев и версии закэшированной разметки обновляем здесь.
+        """
+        objs = super().bulk_create(objs, *args, **kwargs)
+        bump_news_list_version()
+        amounts = Counter(
+            obj.news_id for obj in objs
+            if obj.status == CommentStatus.PUBLISHED
+        )
+        for news_id, amount in amounts.items():
+            bump_news_version(news_id)
+            News.objects.filter(pk=news_id).change_comment_count(amount)
+        return objs
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
@@ -29,9 +130,66 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    status = models.PositiveSmallIntegerField(
+        'Статус',
+        choices=CommentStatus.choices,
+        default=CommentStatus.PUBLISHED,
+    )
+    moderation_note = models.CharField(
+        'Причина отклонения',
+        max_length=200,
+        blank=True,
+    )
+    # Номер публикации по порядку: его ставят триггеры из news.live.
+    # Поток событий идёт по нему, а не по id: комментарий с модерации
+    # публикуется позже, чем создаются более новые.
+    published_seq = models.PositiveBigIntegerField(null=True, editable=False)
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_idx',
+            ),
+            # Страницы «Мои комментарии» по курсору (created, id).
+            models.Index(
+                fields=('author', 'created', 'id'),
+                name='comment_author_created_idx',
+            ),
+            models.Index(
+                fields=('published_seq',),
+                name='comment_published_seq_idx',
+            ),
+            # Очередь модерации: в индексе только ожидающие комментарии.
+            models.Index(
+                fields=('id',),
+                condition=models.Q(status=CommentStatus.PENDING),
+                name='comment_pending_idx',
+            ),
+            # Счётчики ожидающих комментариев по новостям в админке.
+            models.Index(
+                fields=('news',),
+                condition=models.Q(status=CommentStatus.PENDING),
+                name='comment_pending_news_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+
+class BadWord(models.Model):
+    """Запрещённое в комментариях слово, дополняющее встроенный список."""
+    word = models.CharField('Слово', max_length=100, unique=True)
+    changed = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('word',)
+        verbose_name = 'Запрещённое слово'
+        verbose_name_plural = 'Запрещённые слова'
+
+    def __str__(self):
+        return self.word
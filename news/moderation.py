@@ -0,0 +1,233 @@
+"""Модерация комментариев вне запроса.
+
+При ``COMMENT_MODERATION`` форма комментария только сохраняет его
+в статусе «на модерации», и ответ на POST не ждёт никаких проверок.
+Очередь — сами ожидающие комментарии в базе (для них есть частичный
+индекс). Воркер ``manage.py moderate_comments`` забирает их пачками по
+порядку id, прогоняет через классификаторы из ``COMMENT_CLASSIFIERS`` и
+публикует или отклоняет всю пачку несколькими запросами.
+
+Классификатор получает список комментариев и возвращает словарь
+``{id: причина}`` для тех, кого нужно отклонить; первым стоят проверки
+``CommentForm``. Воркер рассчитан на один экземпляр.
+
+Опубликованные комментарии получают номера публикации по порядку,
+поэтому ``news.live.PollingBroker`` в процессах сайта видит их без
+пропусков, даже если они старше уже показанных.
+"""
+import json
+import logging
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cache import bump_news_list_version, bump_news_version
+from .forms import CommentForm
+from .live import publish_comments
+from .models import Comment, CommentStatus, News
+
+logger = logging.getLogger('news.moderation')
+
+STATS_KEY = 'moderation:stats'
+NOTE_MAX_LENGTH = Comment._meta.get_field('moderation_note').max_length
+
+
+def form_check(comments):
+    """Те же проверки, что выполняет форма при публикации без модерации."""
+    rejected = {}
+    for comment in comments:
+        form = CommentForm(data={'text': comment.text})
+        if not form.is_valid():
+            rejected[comment.pk] = ' '.join(
+                error for errors in form.errors.values() for error in errors
+            )
+    return rejected
+
+
+def get_classifiers():
+    return [import_string(path) for path in settings.COMMENT_CLASSIFIERS]
+
+
+@dataclass
+class ModerationStats:
+    """Счётчики воркера с момента запуска."""
+    batches: int = 0
+    published: int = 0
+    rejected: int = 0
+    busy_time: float = 0.0
+    last_lag: float = 0.0
+
+    @property
+    def processed(self):
+        return self.published + self.rejected
+
+    @property
+    def throughput(self):
+        """Комментариев в секунду работы, без простоя пустой очереди."""
+        if not self.busy_time:
+            return 0.0
+        return self.processed / self.busy_time
+
+    def as_log(self):
+        return {
+            **asdict(self),
+            'busy_time': round(self.busy_time, 3),
+            'last_lag': round(self.last_lag, 3),
+            'processed': self.processed,
+            'throughput': round(self.throughput, 1),
+        }
+
+
+def queue_stats():
+    """Глубина очереди и возраст самого старого ожидающего комментария."""
+    queue = Comment.objects.pending().aggregate(
+        pending=Count('pk'), oldest=Min('created')
+    )
+    oldest = queue['oldest']
+    return {
+        'pending': queue['pending'],
+        'lag': (
+            round((timezone.now() - oldest).total_seconds(), 3)
+            if oldest else 0.0
+        ),
+    }
+
+
+def moderation_stats():
+    """
+    Очередь из базы и счётчики воркера из кэша, для страницы статуса.
+
+    Счётчики воркера видны сайту, только если кэш общий для процессов.
+    """
+    return {
+        'queue': queue_stats(),
+        'worker': caches[settings.NEWS_CACHE].get(STATS_KEY),
+    }
+
+
+def change_comment_counts(comments, sign):
+    amounts = Counter(comment.news_id for comment in comments)
+    for news_id, amount in amounts.items():
+        News.objects.filter(pk=news_id).change_comment_count(sign * amount)
+
+
+def unchanged(comments):
+    """
+    Комментарии, статус которых в базе всё ещё тот, что был прочитан.
+
+    Между выборкой и решением комментарий мог удалить автор или
+    опубликовать и отклонить другой модератор; такие пропускаются, чтобы
+    счётчики комментариев не разошлись. Строки блокируются до конца
+    транзакции (в SQLite её и так держит одна запись за раз).
+    """
+    current = dict(
+        Comment.objects.select_for_update()
+        .filter(pk__in=[comment.pk for comment in comments])
+        .values_list('pk', 'status')
+    )
+    return [
+        comment for comment in comments
+        if current.get(comment.pk) == comment.status
+    ]
+
+
+def publish(comments):
+    Comment.objects.filter(
+        pk__in=[comment.pk for comment in comments],
+    ).update(status=CommentStatus.PUBLISHED)
+    change_comment_counts(comments, 1)
+
+
+def reject(comments, reasons):
+    by_reason = defaultdict(list)
+    for comment in comments:
+        by_reason[reasons[comment.pk][:NOTE_MAX_LENGTH]].append(comment.pk)
+    for reason, ids in by_reason.items():
+        Comment.objects.filter(pk__in=ids).update(
+            status=CommentStatus.REJECTED, moderation_note=reason
+        )
+    change_comment_counts(
+        [
+            comment for comment in comments
+            if comment.status == CommentStatus.PUBLISHED
+        ],
+        -1,
+    )
+
+
+def apply_decisions(approved, rejected, reasons):
+    """
+    Публикует ``approved`` и отклоняет ``rejected`` с причинами ``reasons``.
+
+    Общая часть воркера и действий админки: статусы и счётчики меняются
+    массовыми запросами в одной транзакции, опубликованные комментарии
+    уходят читателям после коммита, версии кэша сбрасываются.
+
+    Меняются только комментарии, которые с момента выборки никто не
+    трогал; их и возвращает пара списков ``(published, rejected)``.
+    """
+    with transaction.atomic():
+        current = {comment.pk for comment in unchanged([*approved, *rejected])}
+        approved = [
+            comment for comment in approved
+            if comment.pk in current
+            and comment.status != CommentStatus.PUBLISHED
+        ]
+        rejected = [
+            comment for comment in rejected
+            if comment.pk in current
+            and comment.status != CommentStatus.REJECTED
+        ]
+        publish(approved)
+        reject(rejected, reasons)
+        for comment in approved:
+            comment.status = CommentStatus.PUBLISHED
+        if approved:
+            transaction.on_commit(lambda: publish_comments(approved))
+        for comment in rejected:
+            comment.status = CommentStatus.REJECTED
+    if approved or rejected:
+        bump_news_list_version()
+    for news_id in {comment.news_id for comment in (*approved, *rejected)}:
+        bump_news_version(news_id)
+    return approved, rejected
+
+
+def moderate_batch(stats, batch_size=None):
+    """
+    Проверяет одну пачку ожидающих комментариев.
+
+    Возвращает число обработанных комментариев; 0 — очередь пуста.
+    """
+    start = perf_counter()
+    batch_size = batch_size or settings.COMMENT_MODERATION_BATCH_SIZE
+    comments = list(
+        Comment.objects.pending()
+        .select_related('author')
+        .order_by('pk')[:batch_size]
+    )
+    if not comments:
+        return 0
+    reasons = {}
+    for classifier in get_classifiers():
+        reasons.update(classifier(
+            [comment for comment in comments if comment.pk not in reasons]
+        ))
+    approved = [comment for comment in comments if comment.pk not in reasons]
+    rejected = [comment for comment in comments if comment.pk in reasons]
+    approved, rejected = apply_decisions(approved, rejected, reasons)
+    stats.batches += 1
+    stats.published += len(approved)
+    stats.rejected += len(rejected)
+    stats.busy_time += perf_counter() - start
+    stats.last_lag = (timezone.now() - comments[0].created).total_seconds()
+    caches[settings.NEWS_CACHE].set(STATS_KEY, stats.as_log(), None)
+    logger.info(json.dumps(stats.as_log()))
+    return len(comments)
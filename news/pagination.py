@@ -0,0 +1,190 @@
+"""Постраничный вывод по ключу (keyset) вместо OFFSET.
+
+Страница выбирается условием на значения полей сортировки последнего
+показанного объекта, поэтому её стоимость не зависит от глубины, а
+появление новых записей не сдвигает уже открытые страницы.
+"""
+import base64
+import json
+from functools import reduce
+from operator import or_
+from types import SimpleNamespace
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+BEFORE = 'before'
+AFTER = 'after'
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось разобрать."""
+
+
+def encode_cursor(values):
+    """Непрозрачный для клиента курсор из списка значений."""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """Значения курсора, закодированного ``encode_cursor``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError as error:
+        raise InvalidCursor(cursor) from error
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor(cursor)
+    return values
+
+
+class KeysetPage:
+    """
+    Страница, которая читает строки из базы только при первом обращении.
+
+    Пока к странице не обращаются (например, её разметка взята из кэша),
+    запроса к базе не происходит.
+    """
+
+    def __init__(self, paginator, queryset, backwards, has_cursor):
+        self.paginator = paginator
+        self._queryset = queryset
+        self._backwards = backwards
+        self._has_cursor = has_cursor
+
+    @cached_property
+    def _window(self):
+        per_page = self.paginator.per_page
+        rows = list(self._queryset[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if self._backwards:
+            rows.reverse()
+            has_before, has_after = has_more, self._has_cursor
+        else:
+            has_before, has_after = self._has_cursor, has_more
+        encode = self.paginator.encode
+        return (
+            rows,
+            encode(rows[0]) if rows and has_before else None,
+            encode(rows[-1]) if rows and has_after else None,
+        )
+
+    @property
+    def object_list(self):
+        return self._window[0]
+
+    @property
+    def previous_cursor(self):
+        return self._window[1]
+
+    @property
+    def next_cursor(self):
+        return self._window[2]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Разбивает queryset на страницы по набору полей сортировки.
+
+    ``ordering`` — порядок вывода на странице, например
+    ``('created', 'id')`` или ``('-date', '-id')``. Последнее поле
+    должно быть уникальным, чтобы курсор однозначно задавал позицию.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.descending = [field.startswith('-') for field in self.ordering]
+
+    def encode(self, obj):
+        """
+        Курсор указывает на позицию объекта в сортировке.
+
+        Объект может быть и словарём из ``.values()``.
+        """
+        if isinstance(obj, dict):
+            obj = SimpleNamespace(**obj)
+        return encode_cursor([
+            self._field(name).value_to_string(obj) for name in self.fields
+        ])
+
+    def decode(self, cursor):
+        values = decode_cursor(cursor, len(self.fields))
+        try:
+            return [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (ValidationError, TypeError, ValueError) as error:
+            raise InvalidCursor(cursor) from error
+
+    def page(self, cursor=None, direction=AFTER, from_end=False):
+        """
+        Страница после (``AFTER``) или до (``BEFORE``) курсора.
+
+        Без курсора возвращается первая страница,
+        а при ``from_end=True`` — последняя.
+        """
+        if direction not in (AFTER, BEFORE):
+            raise InvalidCursor(direction)
+        backwards = direction == BEFORE if cursor else from_end
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(
+                self._seek(self.decode(cursor), backwards)
+            )
+        ordering = self._reversed() if backwards else self.ordering
+        return KeysetPage(
+            self, queryset.order_by(*ordering), backwards, bool(cursor)
+        )
+
+    def _field(self, name):
+        return self.queryset.model._meta.get_field(name)
+
+    def _reversed(self):
+        return tuple(
+            name if descending else f'-{name}'
+            for name, descending in zip(self.fields, self.descending)
+        )
+
+    def _seek(self, values, backwards):
+        """
+        Условие «строго после курсора» в порядке обхода.
+
+        Первое поле дополнительно ограничено нестрогим неравенством,
+        чтобы СУБД могла начать поиск по индексу прямо с позиции курсора.
+        """
+        conditions = []
+        for position, (name, value) in enumerate(zip(self.fields, values)):
+            lookup = self._lookup(position, backwards)
+            equal = {
+                field: previous
+                for field, previous in zip(self.fields[:position], values)
+            }
+            conditions.append(Q(**equal, **{f'{name}__{lookup}': value}))
+        first_lookup = self._lookup(0, backwards) + 'e'
+        return Q(**{f'{self.fields[0]}__{first_lookup}': values[0]}) & reduce(
+            or_, conditions
+        )
+
+    def _lookup(self, position, backwards):
+        return 'lt' if self.descending[position] != backwards else 'gt'
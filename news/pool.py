@@ -0,0 +1,40 @@
+"""Пул потоков для работы с базой из асинхронного кода.
+
+Общий для асинхронных страниц и потока событий: его размер
+``ASYNC_VIEW_WORKERS`` ограничивает и одновременные обращения к базе,
+и число открытых ими соединений.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_VIEW_WORKERS,
+    thread_name_prefix='news-pool',
+)
+
+
+def with_connections(func, *args, **kwargs):
+    """
+    Выполняет ``func`` в потоке пула.
+
+    Соединения потока с базой закрываются так же, как в конце обычного
+    запроса, чтобы не держать устаревшие и оборванные.
+    """
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def in_pool(func):
+    """Корутинная обёртка, выполняющая ``func`` в пуле потоков."""
+    return sync_to_async(
+        partial(with_connections, func),
+        thread_sensitive=False,
+        executor=executor,
+    )
@@ -0,0 +1,184 @@
+"""Поиск запрещённых слов за один проход по тексту.
+
+Список слов компилируется в автомат Ахо — Корасик один раз, после чего
+проверка комментария стоит O(длина текста) независимо от размера списка.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import BadWord
+
+# Латинские буквы и цифры, похожие на кириллицу, приводятся к ней,
+# чтобы «peдиcкa», набранная вперемешку, не проходила проверку.
+HOMOGLYPHS = str.maketrans({
+    'a': 'а',
+    'b': 'в',
+    'c': 'с',
+    'e': 'е',
+    'h': 'н',
+    'k': 'к',
+    'm': 'м',
+    'o': 'о',
+    'p': 'р',
+    't': 'т',
+    'x': 'х',
+    'y': 'у',
+    'ё': 'е',
+    '0': 'о',
+    '3': 'з',
+    '6': 'б',
+    '@': 'а',
+})
+
+
+def normalize(text):
+    """Приводит текст к нижнему регистру и кириллическим двойникам букв."""
+    return text.lower().translate(HOMOGLYPHS)
+
+
+class ProfanityMatcher:
+    """
+    Автомат Ахо — Корасик над нормализованным списком слов.
+
+    При ``whole_words=True`` совпадение засчитывается, только если слово
+    не является частью более длинного слова.
+    """
+
+    def __init__(self, words, whole_words=False):
+        self.whole_words = whole_words
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self.size = 0
+        for word in {normalize(word.strip()) for word in words}:
+            if word:
+                self._add(word)
+                self.size += 1
+        self._link()
+
+    def __len__(self):
+        return self.size
+
+    def _add(self, word):
+        node = 0
+        for char in word:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[node][char] = child
+            node = child
+        self._output[node] = (len(word),)
+
+    def _link(self):
+        """Суффиксные ссылки строятся обходом бора в ширину."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] += self._output[self._fail[child]]
+                queue.append(child)
+
+    def search(self, text):
+        """
+        Первое найденное запрещённое слово или None.
+
+        Слово возвращается нормализованным: ``str.lower()`` может изменить
+        длину текста (``'İ'`` — два символа), и позиции в нормализованном
+        тексте не совпадают с позициями в исходном.
+        """
+        normalized = normalize(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for end, char in enumerate(normalized, start=1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length in output[node]:
+                start = end - length
+                if not self.whole_words or self._is_word(
+                    normalized, start, end
+                ):
+                    return normalized[start:end]
+        return None
+
+    @staticmethod
+    def _is_word(text, start, end):
+        before = text[start - 1] if start else ''
+        after = text[end] if end < len(text) else ''
+        return not before.isalnum() and not after.isalnum()
+
+
+class BadWordList:
+    """
+    Актуальный автомат из встроенного списка, файла и таблицы BadWord.
+
+    Источники перечитываются не чаще раза в ``PROFANITY_RELOAD_INTERVAL``
+    секунд и только если изменились: у файла — время изменения,
+    у таблицы — число строк и время последней правки.
+    """
+
+    def __init__(self, words):
+        self.words = tuple(words)
+        self._lock = threading.Lock()
+        self._matcher = None
+        self._signature = None
+        self._checked = 0.0
+
+    @property
+    def matcher(self):
+        now = time.monotonic()
+        interval = settings.PROFANITY_RELOAD_INTERVAL
+        if self._matcher is not None and now - self._checked < interval:
+            return self._matcher
+        with self._lock:
+            signature = self._current_signature()
+            if self._matcher is None or signature != self._signature:
+                self._matcher = ProfanityMatcher(
+                    self._load(),
+                    whole_words=settings.PROFANITY_WHOLE_WORDS,
+                )
+                self._signature = signature
+            self._checked = now
+        return self._matcher
+
+    def invalidate(self):
+        """Следующее обращение заново сверит источники."""
+        self._checked = 0.0
+        self._signature = None
+
+    def search(self, text):
+        return self.matcher.search(text)
+
+    def _current_signature(self):
+        path = settings.BAD_WORDS_FILE
+        mtime = os.stat(path).st_mtime_ns if path else None
+        stats = BadWord.objects.aggregate(
+            total=Count('pk'), changed=Max('changed')
+        )
+        return (
+            path, mtime, stats['total'], stats['changed'],
+            settings.PROFANITY_WHOLE_WORDS,
+        )
+
+    def _load(self):
+        yield from self.words
+        path = settings.BAD_WORDS_FILE
+        if path:
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        yield line
+        yield from BadWord.objects.values_list('word', flat=True).iterator()
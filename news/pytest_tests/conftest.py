@@ -2,16 +2,23 @@ from datetime import datetime, timedelta
 
 import pytest
 from django.conf import settings
+from django.core.cache import cache
 from django.test.client import Client
 from django.urls import reverse
+from django.utils import timezone
 from pytest_lazyfixture import lazy_fixture
 
+from news import cache as news_cache
+from news.forms import bad_words
 from news.models import Comment, News
+from news.ratelimit import get_limiter
 
 COMMENT_TEXT = 'Текст комментария'
 
 NEW_COMMENT_TEXT = 'Обновлённый комментарий'
 
+COMMENTS_ON_DETAIL_PAGE = 3
+
 @pytest.fixture
 def author(django_user_model):
     return django_user_model.objects.create(username='Автор')
@@ -64,6 +71,19 @@ def autouse_db(db):
     pass
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Закэшированная разметка не переживает откат базы после теста."""
+    cache.clear()
+    news_cache.stats.clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    """Вёдра ограничения частоты у каждого теста свои."""
+    get_limiter.cache_clear()
+
+
 @pytest.fixture
 def news_on_home_page():
     today = datetime.today()
@@ -122,6 +142,11 @@ def comment_delete_url(comment):
     return reverse('news:delete', args=(comment.id,))
 
 
+@pytest.fixture
+def user_comments_url():
+    return reverse('news:user_comments')
+
+
 NEWS_HOME_URL = lazy_fixture('news_home_url')
 USERS_LOGIN_URL = lazy_fixture('users_login_url')
 USERS_LOGOUT_URL = lazy_fixture('users_logout_url')
@@ -129,6 +154,32 @@ USERS_SIGHNUP_URL = lazy_fixture('users_signup_url')
 NEWS_DETAIL_URL = lazy_fixture('news_detail_url')
 COMMENT_EDIT_URL = lazy_fixture('comment_edit_url')
 COMMENT_DELETE_URL = lazy_fixture('comment_delete_url')
+USER_COMMENTS_URL = lazy_fixture('user_comments_url')
 
+CLIENT = lazy_fixture('client')
 AUTHOR_CLIENT = lazy_fixture('author_client')
 NOT_AUTHOR_CLIENT = lazy_fixture('not_author_client')
+
+
+@pytest.fixture
+def many_comments(author, news):
+    now = timezone.now()
+    for index in range(COMMENTS_ON_DETAIL_PAGE * 2 + 1):
+        comment = Comment.objects.create(
+            news=news, author=author, text=f'Текст {index}'
+        )
+        comment.created = now + timedelta(minutes=index)
+        comment.save()
+
+
+@pytest.fixture
+def comments_per_page(settings):
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = COMMENTS_ON_DETAIL_PAGE
+
+
+@pytest.fixture
+def fresh_bad_words():
+    """Список запрещённых слов не переживает тест."""
+    bad_words.invalidate()
+    yield bad_words
+    bad_words.invalidate()
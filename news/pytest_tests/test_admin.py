@@ -0,0 +1,125 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from news import admin as news_admin
+from news.admin import ADMIN_REJECT_NOTE, estimated_count
+from news.models import Comment, CommentStatus
+from news.moderation import ModerationStats, apply_decisions, moderate_batch
+from yanews.metrics import assert_query_budget
+
+COMMENTS = 30
+
+NEWS_CHANGELIST_URL = reverse('admin:news_news_changelist')
+COMMENT_CHANGELIST_URL = reverse('admin:news_comment_changelist')
+
+
+@pytest.fixture
+def many_comments(news, author):
+    """Каждый третий комментарий ждёт модерации."""
+    Comment.objects.bulk_create(
+        Comment(
+            news=news,
+            author=author,
+            text=f'Комментарий {index}',
+            status=(
+                CommentStatus.PENDING if index % 3 == 0
+                else CommentStatus.PUBLISHED
+            ),
+        )
+        for index in range(COMMENTS)
+    )
+    return Comment.objects.filter(news=news)
+
+
+@pytest.mark.parametrize(
+    'make_url',
+    (
+        lambda news: NEWS_CHANGELIST_URL,
+        lambda news: f'{NEWS_CHANGELIST_URL}?q={news.title}',
+        lambda news: f'{NEWS_CHANGELIST_URL}?date__year={news.date.year}',
+        lambda news: reverse('admin:news_news_change', args=(news.pk,)),
+        lambda news: COMMENT_CHANGELIST_URL,
+        lambda news: f'{COMMENT_CHANGELIST_URL}?news__id__exact={news.pk}',
+        lambda news: f'{COMMENT_CHANGELIST_URL}?status__exact=2',
+        lambda news: f'{COMMENT_CHANGELIST_URL}?q=Комментарий',
+        lambda news: reverse(
+            'admin:news_comment_change',
+            args=(news.comment_set.first().pk,),
+        ),
+    ),
+)
+def test_admin_pages_fit_query_budgets(
+    make_url, admin_client, news, many_comments
+):
+    """Число запросов не зависит от числа комментариев новости."""
+    response = admin_client.get(make_url(news))
+    assert response.status_code == HTTPStatus.OK
+    assert_query_budget(response)
+
+
+def test_news_page_links_to_comments(admin_client, news, many_comments):
+    """Вместо встроенных форм — ссылка на отфильтрованный список."""
+    response = admin_client.get(
+        reverse('admin:news_news_change', args=(news.pk,))
+    )
+    content = response.content.decode()
+    assert 'Комментарий 1' not in content
+    assert f'{COMMENT_CHANGELIST_URL}?news__id__exact={news.pk}' in content
+    changelist = admin_client.get(NEWS_CHANGELIST_URL)
+    assert changelist.context['cl'].result_list[0].pending_count == (
+        COMMENTS // 3
+    )
+
+
+def test_bulk_actions_keep_counters(admin_client, news, many_comments):
+    pending = many_comments.filter(status=CommentStatus.PENDING)
+    ids = list(pending.values_list('pk', flat=True))
+    admin_client.post(COMMENT_CHANGELIST_URL, {
+        'action': 'publish_comments',
+        '_selected_action': ids,
+    })
+    news.refresh_from_db()
+    assert news.comment_count == COMMENTS
+    admin_client.post(COMMENT_CHANGELIST_URL, {
+        'action': 'reject_comments',
+        '_selected_action': ids[:2],
+    })
+    news.refresh_from_db()
+    assert news.comment_count == COMMENTS - 2
+    assert set(
+        many_comments.filter(status=CommentStatus.REJECTED)
+        .values_list('moderation_note', flat=True)
+    ) == {ADMIN_REJECT_NOTE}
+
+
+def test_bulk_publish_after_worker(
+    monkeypatch, admin_client, news, many_comments
+):
+    """
+    Комментарии, которые воркер опубликовал после выборки админки,
+    не учитываются второй раз.
+    """
+    def worker_first(approved, rejected, reasons):
+        moderate_batch(ModerationStats())
+        return apply_decisions(approved, rejected, reasons)
+
+    monkeypatch.setattr(news_admin, 'apply_decisions', worker_first)
+    pending = many_comments.filter(status=CommentStatus.PENDING)
+    response = admin_client.post(COMMENT_CHANGELIST_URL, {
+        'action': 'publish_comments',
+        '_selected_action': list(pending.values_list('pk', flat=True)),
+    }, follow=True)
+    assert 'Опубликовано: 0.' in response.content.decode()
+    news.refresh_from_db()
+    assert news.comment_count == COMMENTS
+
+
+def test_estimated_count(settings, many_comments):
+    """Оценка берётся из статистики ANALYZE и только без фильтров."""
+    assert estimated_count(Comment.objects.all()) is None
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    assert estimated_count(Comment.objects.all()) == COMMENTS
+    assert estimated_count(many_comments) is None
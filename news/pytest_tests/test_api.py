@@ -0,0 +1,62 @@
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+from news.models import News
+from yanews.metrics import assert_query_budget
+
+API_NEWS_URL = reverse('news:api_news_list')
+
+
+def test_api_news_list_pages(client, news_on_home_page, settings):
+    """Список новостей листается курсором и не отдаёт полный текст."""
+    settings.API_PAGE_SIZE = 4
+    ids = []
+    data = client.get(API_NEWS_URL).json()
+    assert set(data['results'][0]) == {'id', 'title', 'date', 'comment_count'}
+    while True:
+        ids += [row['id'] for row in data['results']]
+        if not data['next']:
+            break
+        data = client.get(API_NEWS_URL, {'after': data['next']}).json()
+    assert ids == list(
+        News.objects.order_by('-date', '-id').values_list('pk', flat=True)
+    )
+
+
+def test_api_fields_selector(client, news):
+    """Параметр fields= выбирает поля ответа."""
+    url = reverse('news:api_news_detail', args=(news.pk,))
+    response = client.get(url, {'fields': 'title,text'})
+    assert response.json() == {'title': news.title, 'text': news.text}
+    assert_query_budget(response)
+    response = client.get(url, {'fields': 'title,secret'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_api_comments(client, news, comment, author):
+    """Комментарии отдаются с именем автора и ETag."""
+    url = reverse('news:api_comments', args=(news.pk,))
+    response = client.get(url)
+    [row] = response.json()['results']
+    assert row['author'] == author.username
+    assert row['text'] == comment.text
+    response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.parametrize(
+    'name, args, params',
+    (
+        ('news:api_news_detail', (0,), {}),
+        ('news:api_comments', (0,), {}),
+        ('news:api_news_list', (), {'after': 'испорчен'}),
+    ),
+)
+def test_api_errors(client, name, args, params):
+    """Ошибки отдаются в JSON с подходящим статусом."""
+    response = client.get(reverse(name, args=args), params)
+    assert response.status_code in (
+        HTTPStatus.NOT_FOUND, HTTPStatus.BAD_REQUEST
+    )
+    assert 'detail' in response.json()
@@ -0,0 +1,66 @@
+from http import HTTPStatus
+from importlib import reload
+from urllib.parse import urlencode
+
+import news.urls
+import pytest
+import yanews.urls
+from asgiref.sync import async_to_sync
+from django.urls import clear_url_caches, reverse
+
+from .conftest import NEWS_DETAIL_URL, NEWS_HOME_URL
+
+# Асинхронные страницы читают базу из потоков пула, поэтому данные
+# теста должны быть закоммичены.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def reload_urls():
+    reload(news.urls)
+    reload(yanews.urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_views(settings):
+    settings.ASYNC_VIEWS = True
+    reload_urls()
+    yield
+    settings.ASYNC_VIEWS = False
+    reload_urls()
+
+
+@pytest.mark.parametrize('url', (NEWS_HOME_URL, NEWS_DETAIL_URL))
+def test_async_pages(async_views, async_client, comment, url):
+    """Страницы под ASGI работают через пул и учитывают свои запросы."""
+    response = async_to_sync(async_client.get)(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.metrics.queries > 0
+    assert not response.metrics.over_budget
+    response = async_to_sync(async_client.get)(
+        url, **{'If-None-Match': response['ETag']}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.parametrize('url', (NEWS_HOME_URL, NEWS_DETAIL_URL))
+def test_sync_pages_count_queries(async_client, comment, url):
+    """Синхронные страницы под ASGI тоже учитывают свои запросы."""
+    response = async_to_sync(async_client.get)(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.metrics.queries > 0
+
+
+def test_async_comment(async_views, async_client, author, news):
+    """Комментарий через асинхронную страницу новости сохраняется."""
+    async_client.force_login(author)
+    url = reverse('news:detail', args=(news.pk,))
+    # Multipart-тело AsyncClient в Django 3.2 разбирается с ошибкой,
+    # поэтому форма отправляется как urlencoded.
+    response = async_to_sync(async_client.post)(
+        url,
+        urlencode({'text': 'Асинхронно'}),
+        content_type='application/x-www-form-urlencoded',
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert news.comment_set.get().text == 'Асинхронно'
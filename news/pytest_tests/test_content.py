@@ -1,13 +1,25 @@
-from django.conf import settings
+from datetime import date, timedelta
+from http import HTTPStatus
+from io import StringIO
 
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from news import cache as news_cache
 from news.forms import CommentForm
+from news.models import Comment, News
+
+from .conftest import COMMENTS_ON_DETAIL_PAGE
 
 
 def test_news_count(client, news_on_home_page, news_home_url):
     """Количество новостей на главной странице — не более 10."""
     response = client.get(news_home_url)
     object_list = response.context['object_list']
-    new_count = object_list.count()
+    new_count = len(object_list)
     assert new_count == settings.NEWS_COUNT_ON_HOME_PAGE
 
 
@@ -54,3 +66,189 @@ def test_authorized_client_has_form(author_client, news, news_detail_url):
     response = author_client.get(news_detail_url)
     assert 'form' in response.context
     assert isinstance(response.context['form'], CommentForm)
+
+
+def test_home_page_single_query(
+    client, news_on_home_page, comment, news_home_url,
+    django_assert_num_queries
+):
+    """Главная страница со счётчиками комментариев — один запрос."""
+    with django_assert_num_queries(1):
+        response = client.get(news_home_url)
+    assert 'Комментариев: 1' in response.content.decode()
+
+
+def test_comments_are_paginated_by_cursor(
+    client, comments_per_page, many_comments, news_detail_url
+):
+    """
+    Без курсора видны самые свежие комментарии,
+    а по ссылкам «раньше»/«новее» — остальные без пропусков и повторов.
+    """
+    page = client.get(news_detail_url).context['comments']
+    assert len(page) == COMMENTS_ON_DETAIL_PAGE
+    assert not page.has_next
+    seen = [comment.pk for comment in page]
+    while page.has_previous:
+        page = client.get(
+            news_detail_url, {'before': page.previous_cursor}
+        ).context['comments']
+        seen = [comment.pk for comment in page] + seen
+    expected = list(Comment.objects.values_list('pk', flat=True))
+    assert seen == expected
+    start = len(page)
+    page = client.get(
+        news_detail_url, {'after': page.next_cursor}
+    ).context['comments']
+    assert [comment.pk for comment in page] == expected[
+        start:start + COMMENTS_ON_DETAIL_PAGE
+    ]
+
+
+def test_new_comment_is_on_redirect_page(
+    author_client, comments_per_page, many_comments, news_detail_url,
+    form_data
+):
+    """После отправки автор попадает на страницу со своим комментарием."""
+    response = author_client.post(
+        news_detail_url, data=form_data, follow=True
+    )
+    new_comment = Comment.objects.latest('created')
+    assert new_comment in response.context['comments']
+
+
+def test_invalid_comments_cursor(client, news_detail_url):
+    """Испорченный курсор — это 404, а не ошибка сервера."""
+    response = client.get(news_detail_url, {'before': 'испорчен'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_news_pages_by_cursor(client, news_on_home_page, news_home_url):
+    """Более ранние новости открываются по курсору, без повторов."""
+    first_page = client.get(news_home_url).context['page_obj']
+    assert first_page.has_next
+    assert not first_page.has_previous
+    next_page = client.get(
+        news_home_url, {'after': first_page.next_cursor}
+    ).context['page_obj']
+    assert not next_page.has_next
+    assert list(first_page) + list(next_page) == list(News.objects.all())
+
+
+def test_news_archive(client, news_on_home_page):
+    """Архив за день содержит только новости этого дня."""
+    yesterday = date.today() - timedelta(days=1)
+    url = reverse(
+        'news:archive_day',
+        args=(yesterday.year, yesterday.month, yesterday.day),
+    )
+    object_list = client.get(url).context['object_list']
+    assert [news.date for news in object_list] == [yesterday]
+    response = client.get(reverse('news:archive_month', args=(2022, 13)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_home_page_cache(
+    client, author_client, author, news_on_home_page, news,
+    news_home_url, django_assert_num_queries
+):
+    """
+    Повторный запрос главной берёт список из кэша без запросов к базе,
+    новый комментарий сбрасывает кэш, а шапка остаётся личной.
+    """
+    client.get(news_home_url)
+    with django_assert_num_queries(0):
+        client.get(news_home_url)
+    assert news_cache.stats['news_list', 'misses'] == 1
+    assert news_cache.stats['news_list', 'hits'] == 1
+    Comment.objects.create(news=news, author=author, text='Текст')
+    response = author_client.get(news_home_url)
+    assert news_cache.stats['news_list', 'misses'] == 2
+    content = response.content.decode()
+    assert 'Комментариев: 1' in content
+    assert author.username in content
+
+
+def test_comments_block_cache(
+    author_client, not_author_client, comment, news_detail_url,
+    comment_edit_url
+):
+    """
+    Блок комментариев рисуется один раз на версию новости,
+    а ссылки редактирования видит только автор комментария.
+    """
+    response = author_client.get(news_detail_url)
+    assert comment_edit_url in response.content.decode()
+    response = not_author_client.get(news_detail_url)
+    assert comment_edit_url not in response.content.decode()
+    assert news_cache.stats['comments', 'misses'] == 1
+    assert news_cache.stats['comments', 'hits'] == 1
+    comment.text = 'Новый текст'
+    comment.save()
+    response = not_author_client.get(news_detail_url)
+    assert 'Новый текст' in response.content.decode()
+    assert news_cache.stats['comments', 'misses'] == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_versions_move_after_commit(author, news, news_detail_url):
+    """
+    Разметка, собранная до коммита под уже сдвинутой версией, после
+    коммита не читается.
+    """
+    with transaction.atomic():
+        Comment.objects.create(news=news, author=author, text='Текст')
+        before_commit = news_cache.news_version(news.pk)
+    assert news_cache.news_version(news.pk) > before_commit
+
+
+def test_teaser_is_stored(client, news_home_url):
+    """Анонс считается при сохранении и выводится без полного текста."""
+    words = [f'слово{index}' for index in range(30)]
+    news = News.objects.create(title='Длинная', text=' '.join(words))
+    assert news.teaser == ' '.join(words[:15]) + ' …'
+    News.objects.bulk_create([News(title='Короткая', text='Два слова')])
+    assert News.objects.get(title='Короткая').teaser == 'Два слова'
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(news_home_url)
+    assert news.teaser in response.content.decode()
+    assert 'слово20' not in response.content.decode()
+    assert '"news_news"."text"' not in queries[0]['sql']
+
+
+def test_refresh_teasers(settings):
+    """Команда пересчитывает анонсы после смены их длины."""
+    news = News.objects.create(title='Заголовок', text='Текст новости')
+    settings.NEWS_TEASER_WORDS = 1
+    out = StringIO()
+    call_command('refresh_teasers', stdout=out)
+    assert 'новостей: 1' in out.getvalue()
+    news.refresh_from_db()
+    assert news.teaser == 'Текст …'
+
+
+def test_user_comments(
+    settings, author_client, not_author, news, many_comments
+):
+    """
+    Свои комментарии по всем новостям, от свежих к старым, страницами
+    по курсору; число запросов одинаково на любой странице.
+    """
+    settings.USER_COMMENTS_ON_PAGE = COMMENTS_ON_DETAIL_PAGE
+    Comment.objects.create(news=news, author=not_author, text='Чужой')
+    url = reverse('news:user_comments')
+    response = author_client.get(url)
+    first_page_queries = response.metrics.queries
+    page = response.context['page_obj']
+    seen = [comment.pk for comment in page]
+    while page.has_next:
+        response = author_client.get(url, {'after': page.next_cursor})
+        assert response.metrics.queries == first_page_queries
+        page = response.context['page_obj']
+        seen += [comment.pk for comment in page]
+    assert seen == list(
+        Comment.objects.filter(author__username='Автор')
+        .order_by('-created', '-id')
+        .values_list('pk', flat=True)
+    )
+    assert news.title in response.content.decode()
@@ -0,0 +1,68 @@
+import csv
+import gzip
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+COMMENTS_EXPORT_URL = reverse('news:export', args=('comments',))
+
+
+@pytest.fixture
+def staff_client(client, author):
+    author.is_staff = True
+    author.save()
+    client.force_login(author)
+    return client
+
+
+def test_export_is_staff_only(author_client):
+    """Обычный пользователь выгрузку не получает."""
+    response = author_client.get(COMMENTS_EXPORT_URL)
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+def test_export_comments_ndjson(staff_client, comment, author):
+    """Комментарии выгружаются потоком вместе с именем автора."""
+    response = staff_client.get(COMMENTS_EXPORT_URL)
+    assert response.streaming
+    [row] = [
+        json.loads(line)
+        for line in b''.join(response.streaming_content).splitlines()
+    ]
+    assert row['author'] == author.username
+    assert row['text'] == comment.text
+    response = staff_client.get(
+        COMMENTS_EXPORT_URL, {'since': row['created']}
+    )
+    assert b''.join(response.streaming_content) == b''
+
+
+def test_export_news_csv_gzip(staff_client, news):
+    """Новости выгружаются в CSV со сжатием."""
+    response = staff_client.get(
+        reverse('news:export', args=('news',)),
+        {'format': 'csv', 'gzip': '1'},
+    )
+    assert response['Content-Type'] == 'application/gzip'
+    content = gzip.decompress(b''.join(response.streaming_content))
+    header, row = csv.reader(StringIO(content.decode()))
+    assert dict(zip(header, row))['title'] == news.title
+
+
+def test_export_bad_params(staff_client):
+    """Неразборчивая отметка since — ошибка запроса."""
+    response = staff_client.get(COMMENTS_EXPORT_URL, {'since': 'вчера'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_export_data_command(comment):
+    """Команда выгружает то же самое в stdout."""
+    out = StringIO()
+    call_command('export_data', 'comments', '--format', 'csv', stdout=out)
+    rows = list(csv.reader(StringIO(out.getvalue())))
+    assert rows[0] == ['id', 'news_id', 'author', 'text', 'created', 'status']
+    assert len(rows) == 2
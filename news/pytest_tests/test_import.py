@@ -0,0 +1,62 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from news.models import News
+
+
+@pytest.fixture
+def ndjson_feed(tmp_path):
+    rows = [
+        {'title': 'Первая', 'text': 'Текст', 'date': '2024-05-01'},
+        {'title': 'Первая', 'text': 'Повтор', 'date': '2024-05-01'},
+        {'title': 'Вторая', 'text': 'Текст', 'date': '2024-05-02'},
+        {'title': 'Х' * 51, 'text': 'Текст', 'date': '2024-05-02'},
+        {'title': 'Третья', 'text': 'Текст', 'date': '2024-13-40'},
+        {'title': 123, 'text': 'Текст'},
+        {'title': 'Четвёртая', 'text': ['Текст']},
+        {'title': 'Пятая', 'text': 'Текст', 'date': 20240501},
+    ]
+    path = tmp_path / 'feed.ndjson'
+    path.write_text(
+        '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows)
+        + '\nне json\n',
+        encoding='utf-8',
+    )
+    return path
+
+
+def test_import_news_validates_and_dedupes(ndjson_feed):
+    """Импорт отбрасывает неверные строки и дубликаты, в том числе в базе."""
+    out, err = StringIO(), StringIO()
+    call_command(
+        'import_news', str(ndjson_feed), batch_size=2, stdout=out, stderr=err
+    )
+    assert sorted(News.objects.values_list('title', flat=True)) == [
+        'Вторая', 'Первая',
+    ]
+    assert 'создано новостей: 2, дубликатов: 1, с ошибками: 6' in (
+        out.getvalue()
+    )
+    assert 'строка 4' in err.getvalue()
+    assert 'строка 6: заголовок должен быть строкой' in err.getvalue()
+    call_command('import_news', str(ndjson_feed), stdout=StringIO(),
+                 stderr=StringIO())
+    assert News.objects.count() == 2
+
+
+def test_import_news_csv_with_workers(tmp_path):
+    """CSV можно проверять в пуле процессов."""
+    path = tmp_path / 'feed.csv'
+    path.write_text(
+        'title,text,date\n'
+        + ''.join(f'Новость {index},"Текст,\nв две строки",2024-01-01\n'
+                  for index in range(30)),
+        encoding='utf-8',
+    )
+    call_command(
+        'import_news', str(path), workers=2, batch_size=7, stdout=StringIO()
+    )
+    assert News.objects.count() == 30
+    assert News.objects.first().text == 'Текст,\nв две строки'
@@ -0,0 +1,212 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.urls import reverse
+from news import live
+from news.models import Comment, CommentStatus
+from news.moderation import apply_decisions
+
+# Поток событий читает базу из потоков пула, поэтому данные теста
+# должны быть закоммичены.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+async def not_found(scope, receive, send):
+    raise AssertionError('Запрос не должен был дойти до Django.')
+
+
+class EventStream:
+    """Клиент ASGI, читающий поток событий до отключения."""
+
+    def __init__(self, path, query_string=b''):
+        self.scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string,
+            'headers': [],
+        }
+        self.messages = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self.requested = False
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        await self.messages.put(message)
+
+    def start(self):
+        self.task = asyncio.ensure_future(
+            live.LiveComments(not_found)(self.scope, self.receive, self.send)
+        )
+
+    async def next(self):
+        return await asyncio.wait_for(self.messages.get(), timeout=5)
+
+    async def close(self):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+def test_events_need_asgi(client, news):
+    """Под WSGI поток недоступен, и браузер не переподключается."""
+    response = client.get(reverse('news:events', args=(news.pk,)))
+    assert response.status_code == HTTPStatus.NO_CONTENT
+
+
+def test_detail_page_subscribes_after_last_comment(
+    client, comment, news_detail_url
+):
+    Comment.objects.filter(pk=comment.pk).update(status=CommentStatus.PENDING)
+    Comment.objects.filter(pk=comment.pk).update(
+        status=CommentStatus.PUBLISHED
+    )
+    comment.refresh_from_db()
+    assert comment.published_seq != comment.pk
+    response = client.get(news_detail_url)
+    events_url = reverse('news:events', args=(comment.news.pk,))
+    assert (
+        f'{events_url}?last_id={comment.published_seq}'
+        in response.content.decode()
+    )
+
+
+def test_new_comment_is_pushed(
+    author_client, comment, news_detail_url, form_data
+):
+    """Читатель получает пропущенный и только что добавленный комментарии."""
+    url = reverse('news:events', args=(comment.news.pk,))
+    comment.refresh_from_db()
+
+    async def read():
+        stream = EventStream(url, b'last_id=0')
+        stream.start()
+        start = await stream.next()
+        assert start['status'] == HTTPStatus.OK
+        assert (b'content-type', b'text/event-stream; charset=utf-8') in (
+            start['headers']
+        )
+        assert (await stream.next())['body'].startswith(b'retry:')
+        replayed = (await stream.next())['body'].decode()
+        assert f'id: {comment.published_seq}\n' in replayed
+        await sync_to_async(author_client.post)(news_detail_url, form_data)
+        pushed = (await stream.next())['body'].decode()
+        await stream.close()
+        return pushed
+
+    pushed = async_to_sync(read)()
+    new_comment = Comment.objects.latest('pk')
+    assert f'id: {new_comment.published_seq}\n' in pushed
+    assert form_data['text'] in pushed
+    assert live.broker.channels() == []
+
+
+def test_replay_sends_whole_backlog(settings, author, news):
+    """Отставший читатель получает все пропущенные комментарии пачками."""
+    settings.LIVE_REPLAY_LIMIT = 2
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for index in range(5)
+    )
+    url = reverse('news:events', args=(news.pk,))
+
+    async def read():
+        stream = EventStream(url, b'last_id=0')
+        stream.start()
+        await stream.next()
+        await stream.next()
+        bodies = [(await stream.next())['body'].decode() for _ in range(5)]
+        await stream.close()
+        return bodies
+
+    bodies = async_to_sync(read)()
+    assert [body.split('\n', 1)[0] for body in bodies] == [
+        f'id: {published_seq}' for published_seq in (
+            Comment.objects.order_by('published_seq')
+            .values_list('published_seq', flat=True)
+        )
+    ]
+
+
+def test_publish_without_subscribers(
+    comment, django_assert_num_queries, monkeypatch
+):
+    """Новость никто не читает: комментарий не читается и не рисуется."""
+    monkeypatch.setattr(live, 'comment_event', None)
+    with django_assert_num_queries(0):
+        live.publish_comments([comment])
+
+
+def test_events_for_missing_news(db):
+    async def read():
+        stream = EventStream(reverse('news:events', args=(404,)))
+        stream.start()
+        start = await stream.next()
+        await stream.close()
+        return start
+
+    assert async_to_sync(read)()['status'] == HTTPStatus.NOT_FOUND
+
+
+def test_polling_broker_sees_other_processes(settings, author, news):
+    """Комментарий, сохранённый без публикации, находит опрос базы."""
+    settings.LIVE_POLL_INTERVAL = 0.01
+    broker = live.PollingBroker()
+
+    async def read():
+        subscription = broker.subscribe(news.pk)
+        await asyncio.sleep(0.2)
+        comment = await sync_to_async(Comment.objects.create)(
+            news=news, author=author, text='Из другого процесса'
+        )
+        event = await asyncio.wait_for(subscription.queue.get(), timeout=5)
+        broker.unsubscribe(subscription)
+        await asyncio.wait_for(broker.poller, timeout=5)
+        return comment, event
+
+    comment, event = async_to_sync(read)()
+    comment.refresh_from_db()
+    assert event['id'] == comment.published_seq
+    assert 'Из другого процесса' in event['html']
+
+
+def test_polling_broker_sees_late_publication(settings, author, news):
+    """
+    Комментарий, ждавший модерации до начала опроса, публикуется позже
+    более нового и всё равно доходит до читателей.
+    """
+    # Публикация успевает между опросами: в общей памяти тестовой базы
+    # SQLite чтение во время записи падает с «table is locked».
+    settings.LIVE_POLL_INTERVAL = 0.5
+    pending = Comment.objects.create(
+        news=news, author=author, text='С модерации',
+        status=CommentStatus.PENDING,
+    )
+    newer = Comment.objects.create(
+        news=news, author=author, text='Более новый'
+    )
+    broker = live.PollingBroker()
+
+    async def read():
+        subscription = broker.subscribe(news.pk)
+        await asyncio.sleep(0.1)
+        await sync_to_async(apply_decisions)([pending], [], {})
+        event = await asyncio.wait_for(subscription.queue.get(), timeout=5)
+        broker.unsubscribe(subscription)
+        await asyncio.wait_for(broker.poller, timeout=5)
+        return event
+
+    event = async_to_sync(read)()
+    pending.refresh_from_db()
+    newer.refresh_from_db()
+    assert pending.pk < newer.pk
+    assert pending.published_seq > newer.published_seq
+    assert event['id'] == pending.published_seq
+    assert 'С модерации' in event['html']
@@ -1,7 +1,13 @@
 from http import HTTPStatus
+from io import StringIO
 
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.models import BadWord, Comment, News
+from news.profanity import ProfanityMatcher
+from news.ratelimit import Limit, advance
 from pytest_django.asserts import assertFormError, assertRedirects
 
 from .conftest import COMMENT_TEXT, NEW_COMMENT_TEXT
@@ -89,3 +95,195 @@ def test_user_cant_edit_comment_of_another_user(
     assert response.status_code == HTTPStatus.NOT_FOUND
     comment.refresh_from_db()
     assert comment.text == COMMENT_TEXT
+
+
+def test_comment_count_follows_create_and_delete(
+    author_client, form_data, news, news_detail_url, comment_delete_url
+):
+    """Счётчик комментариев новости учитывает создание и удаление."""
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    author_client.post(news_detail_url, data=form_data)
+    news.refresh_from_db()
+    assert news.comment_count == 2
+    author_client.delete(comment_delete_url)
+    news.refresh_from_db()
+    assert news.comment_count == 1
+
+
+def test_comment_count_follows_bulk_operations(author, news):
+    """Массовые операции с комментариями не ломают счётчик."""
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(5)
+    )
+    news.refresh_from_db()
+    assert news.comment_count == 5
+    Comment.objects.filter(news=news).delete()
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+def test_recount_comments_command(comment, news):
+    """Команда recount_comments находит и исправляет неверные счётчики."""
+    News.objects.filter(pk=news.pk).update(comment_count=42)
+    with pytest.raises(CommandError):
+        call_command('recount_comments', '--check', stdout=StringIO())
+    call_command('recount_comments', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    call_command('recount_comments', '--check', stdout=StringIO())
+
+
+@pytest.mark.parametrize(
+    'text, whole_words, expected',
+    (
+        ('Ты PEДИCKA!', False, 'редиск'),
+        ('Ну и редиской же ты оказался', False, 'редиск'),
+        ('Ну и редиской же ты оказался', True, None),
+        ('Ну ты и редиск...', True, 'редиск'),
+        ('Обычный текст', False, None),
+        ('İİİ редиска', False, 'редиск'),
+        ('İİİ редиска', True, None),
+        ('İ' * 10 + ' редиск', True, 'редиск'),
+    ),
+)
+def test_profanity_matcher(text, whole_words, expected):
+    """Автомат находит слова с латинскими двойниками и по границам слов."""
+    matcher = ProfanityMatcher(('редиск', 'негодяй'), whole_words=whole_words)
+    assert matcher.search(text) == expected
+
+
+@pytest.mark.parametrize('prefix', ('İ' * 3, 'İ' * 10))
+def test_bad_words_after_case_folding(
+    author_client, news_detail_url, prefix
+):
+    """Строчная ``'İ'`` длиннее заглавной, но слово всё равно находится."""
+    response = author_client.post(
+        news_detail_url, data={'text': f'{prefix} {BAD_WORDS[0]}'}
+    )
+    assertFormError(response, form='form', field='text', errors=WARNING)
+    assert Comment.objects.count() == 0
+
+
+def test_bad_words_reload_from_db_and_file(
+    author_client, news_detail_url, settings, tmp_path, fresh_bad_words
+):
+    """Запрещённые слова из таблицы и файла действуют без перезапуска."""
+    BadWord.objects.create(word='бяка')
+    response = author_client.post(news_detail_url, data={'text': 'Бяка!'})
+    assertFormError(response, form='form', field='text', errors=WARNING)
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# модерация\nзлыдень\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = words_file
+    settings.PROFANITY_RELOAD_INTERVAL = 0
+    response = author_client.post(news_detail_url, data={'text': 'Злыдень'})
+    assertFormError(response, form='form', field='text', errors=WARNING)
+    assert Comment.objects.count() == 0
+
+
+def test_generate_data_command(django_user_model):
+    """Синтетические комментарии распределены по новостям неравномерно."""
+    call_command(
+        'generate_data', users=3, news=5, comments=200, stdout=StringIO()
+    )
+    assert django_user_model.objects.count() == 3
+    counts = list(
+        News.objects.order_by('-date', '-id')
+        .values_list('comment_count', flat=True)
+    )
+    assert sum(counts) == Comment.objects.count() == 200
+    assert counts[0] == max(counts)
+    call_command('recount_comments', '--check', stdout=StringIO())
+
+
+@pytest.mark.parametrize(
+    'limiter',
+    ('news.ratelimit.LocalBuckets', 'news.ratelimit.CacheBuckets'),
+)
+def test_comment_rate_limit(
+    settings, limiter, author_client, not_author_client, form_data,
+    news_detail_url
+):
+    """
+    Сверх лимита пользователь получает 429, не обращаясь к базе;
+    у другого пользователя своё ведро.
+    """
+    settings.COMMENT_RATE_LIMITER = limiter
+    settings.COMMENT_RATE_LIMITS = {'user': (2, 60), 'ip': None}
+    for _ in range(2):
+        response = author_client.post(news_detail_url, data=form_data)
+        assert response.status_code == HTTPStatus.FOUND
+    response = author_client.post(news_detail_url, data=form_data)
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(response['Retry-After']) == 30
+    assert response.metrics.queries == 0
+    assert Comment.objects.count() == 2
+    response = not_author_client.post(news_detail_url, data=form_data)
+    assert response.status_code == HTTPStatus.FOUND
+
+
+def test_ip_rate_limit_covers_edits(
+    settings, author_client, not_author_client, form_data, form_data_new,
+    news_detail_url, comment_edit_url
+):
+    settings.COMMENT_RATE_LIMITS = {'user': None, 'ip': (2, 60)}
+    author_client.post(news_detail_url, data=form_data)
+    not_author_client.post(news_detail_url, data=form_data)
+    response = author_client.post(comment_edit_url, data=form_data_new)
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert author_client.get(comment_edit_url).status_code == HTTPStatus.OK
+
+
+def test_user_over_limit_keeps_ip_tokens(
+    settings, author_client, not_author_client, form_data, news_detail_url
+):
+    """Отклонённые запросы не расходуют общее ведро адреса."""
+    settings.COMMENT_RATE_LIMITS = {'user': (1, 60), 'ip': (2, 60)}
+    for _ in range(5):
+        author_client.post(news_detail_url, data=form_data)
+    response = not_author_client.post(news_detail_url, data=form_data)
+    assert response.status_code == HTTPStatus.FOUND
+
+
+def test_client_ip_header(
+    settings, author_client, not_author_client, form_data, news_detail_url
+):
+    """За прокси вёдра адресов различаются по заголовку прокси."""
+    settings.COMMENT_RATE_LIMITS = {'user': None, 'ip': (1, 60)}
+    settings.CLIENT_IP_HEADER = 'HTTP_X_FORWARDED_FOR'
+    response = author_client.post(
+        news_detail_url, data=form_data,
+        HTTP_X_FORWARDED_FOR='10.0.0.2, 192.0.2.1',
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    response = not_author_client.post(
+        news_detail_url, data=form_data, HTTP_X_FORWARDED_FOR='192.0.2.2'
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    response = not_author_client.post(
+        news_detail_url, data=form_data,
+        HTTP_X_FORWARDED_FOR='192.0.2.1, 192.0.2.2',
+    )
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+
+def test_anonymous_posts_are_not_limited(
+    settings, client, form_data, news_detail_url, users_login_url
+):
+    settings.COMMENT_RATE_LIMITS = {'user': (1, 60), 'ip': (1, 60)}
+    for _ in range(3):
+        response = client.post(news_detail_url, data=form_data)
+        assert response.url.startswith(users_login_url)
+
+
+def test_token_bucket_refills():
+    """Два жетона за 10 секунд: третий запрос ждёт пять секунд."""
+    limit = Limit(2, 10)
+    full_at, wait = advance(None, 0, limit)
+    full_at, wait = advance(full_at, 0, limit)
+    assert wait == 0
+    full_at, wait = advance(full_at, 0, limit)
+    assert wait == 5
+    full_at, wait = advance(full_at, 5, limit)
+    assert wait == 0
@@ -0,0 +1,109 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from news import search
+from news.forms import BAD_WORDS, WARNING
+from news.models import Comment, CommentStatus
+from news.moderation import apply_decisions
+
+from .conftest import COMMENT_TEXT
+
+MODERATION_URL = reverse('news:moderation')
+
+
+@pytest.fixture
+def moderation(settings):
+    settings.COMMENT_MODERATION = True
+
+
+def test_comment_waits_for_moderation(
+    moderation, author_client, news, news_detail_url, form_data
+):
+    """POST только ставит комментарий в очередь, не проверяя текст."""
+    bad_words_data = {'text': f'Какой-то текст, {BAD_WORDS[0]}'}
+    response = author_client.post(news_detail_url, data=bad_words_data)
+    assert response.status_code == HTTPStatus.FOUND
+    author_client.post(news_detail_url, data=form_data)
+    assert Comment.objects.pending().count() == 2
+    response = author_client.get(news_detail_url)
+    assert 'Комментарий появится после проверки.' in (
+        response.content.decode()
+    )
+    assert COMMENT_TEXT not in response.content.decode()
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+def test_worker_publishes_and_rejects(
+    moderation, author_client, news, news_detail_url, form_data
+):
+    """Воркер публикует чистые комментарии и отклоняет ругань."""
+    author_client.post(
+        news_detail_url, data={'text': f'Какой-то текст, {BAD_WORDS[0]}'}
+    )
+    author_client.post(news_detail_url, data=form_data)
+    out = StringIO()
+    call_command('moderate_comments', '--once', stdout=out)
+    assert 'Опубликовано: 1, отклонено: 1.' in out.getvalue()
+    rejected = Comment.objects.get(status=CommentStatus.REJECTED)
+    assert rejected.moderation_note == WARNING
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    response = author_client.get(news_detail_url)
+    assert COMMENT_TEXT in response.content.decode()
+    if search.is_available():
+        assert len(search.search(COMMENT_TEXT).hits) == 1
+        assert not search.search(BAD_WORDS[0]).hits
+
+
+def test_pending_comment_is_not_searchable(moderation, author_client, news):
+    if not search.is_available():
+        pytest.skip('Поиск работает только на SQLite.')
+    author_client.post(
+        reverse('news:detail', args=(news.pk,)), data={'text': 'Ожидание'}
+    )
+    assert not search.search('Ожидание').hits
+
+
+def test_moderation_status(
+    moderation, admin_client, author_client, news_detail_url, form_data
+):
+    """Сотрудник видит глубину очереди, задержку и счётчики воркера."""
+    assert author_client.get(MODERATION_URL).status_code == (
+        HTTPStatus.FORBIDDEN
+    )
+    author_client.post(news_detail_url, data=form_data)
+    status = admin_client.get(MODERATION_URL).json()
+    assert status['queue']['pending'] == 1
+    assert status['queue']['lag'] >= 0
+    assert status['worker'] is None
+    call_command('moderate_comments', '--once', stdout=StringIO())
+    status = admin_client.get(MODERATION_URL).json()
+    assert status['queue'] == {'pending': 0, 'lag': 0.0}
+    assert status['worker']['published'] == 1
+    assert status['worker']['batches'] == 1
+
+
+def test_decisions_skip_changed_comments(moderation, author, news):
+    """
+    Комментарий, удалённый или опубликованный после выборки, не меняет
+    счётчик ещё раз.
+    """
+    deleted, twice = (
+        Comment.objects.create(
+            news=news, author=author, text=COMMENT_TEXT,
+            status=CommentStatus.PENDING,
+        )
+        for _ in range(2)
+    )
+    batch = list(Comment.objects.pending())
+    other_batch = list(Comment.objects.pending().filter(pk=twice.pk))
+    deleted.delete()
+    assert apply_decisions(other_batch, [], {}) == (other_batch, [])
+    published, rejected = apply_decisions(batch, [], {})
+    assert (published, rejected) == ([], [])
+    news.refresh_from_db()
+    assert news.comment_count == 1
@@ -0,0 +1,173 @@
+from datetime import date
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from news.pagination import AFTER, BEFORE
+from pytest_lazyfixture import lazy_fixture
+from yanews.metrics import assert_query_budget
+
+from .conftest import (
+    AUTHOR_CLIENT,
+    CLIENT,
+    COMMENT_DELETE_URL,
+    COMMENT_EDIT_URL,
+    COMMENTS_ON_DETAIL_PAGE,
+    NEWS_DETAIL_URL,
+    NEWS_HOME_URL,
+    USER_COMMENTS_URL,
+)
+
+ADMIN_CLIENT = lazy_fixture('admin_client')
+NEWS_ARCHIVE_URL = lazy_fixture('news_archive_url')
+ADMIN_NEWS_CHANGELIST_URL = lazy_fixture('admin_news_changelist_url')
+
+
+@pytest.fixture
+def news_archive_url():
+    return reverse('news:archive_year', args=(date.today().year,))
+
+
+@pytest.fixture
+def admin_news_changelist_url():
+    return reverse('admin:news_news_changelist')
+
+
+def view_selects(client, url, table, **params):
+    """SQL, которым страница читает таблицу ``table``."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, params)
+    assert response.status_code == HTTPStatus.OK
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT')
+        and f'FROM "{table}"' in query['sql']
+    ]
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return '\n'.join(row[-1] for row in cursor.fetchall())
+
+
+def first_page_cursor(client, url):
+    """Курсор соседней страницы: следующей или, у комментариев, прошлой."""
+    context = client.get(url).context
+    page = context['comments'] if 'comments' in context else (
+        context['page_obj']
+    )
+    return {
+        AFTER: page.next_cursor, BEFORE: page.previous_cursor,
+    }
+
+
+@pytest.mark.parametrize(
+    'parametrized_client, url, direction, table, index_name',
+    (
+        (CLIENT, NEWS_HOME_URL, None, 'news_news', 'news_date_id_idx'),
+        (CLIENT, NEWS_HOME_URL, AFTER, 'news_news', 'news_date_id_idx'),
+        (
+            CLIENT, NEWS_ARCHIVE_URL, None,
+            'news_news', 'news_date_id_idx',
+        ),
+        (
+            CLIENT, NEWS_DETAIL_URL, None,
+            'news_comment', 'comment_news_created_idx',
+        ),
+        (
+            CLIENT, NEWS_DETAIL_URL, BEFORE,
+            'news_comment', 'comment_news_created_idx',
+        ),
+        (
+            AUTHOR_CLIENT, USER_COMMENTS_URL, None,
+            'news_comment', 'comment_author_created_idx',
+        ),
+        (
+            AUTHOR_CLIENT, USER_COMMENTS_URL, AFTER,
+            'news_comment', 'comment_author_created_idx',
+        ),
+        (
+            ADMIN_CLIENT, ADMIN_NEWS_CHANGELIST_URL, None,
+            'news_comment', 'comment_pending_news_idx',
+        ),
+    ),
+)
+def test_view_queries_use_indexes(
+    parametrized_client, url, direction, table, index_name,
+    news_on_home_page, many_comments, comments_per_page, settings
+):
+    """
+    Запросы, которые выполняют сами страницы, в том числе переход по
+    курсору, идут по составным индексам без полного скана и сортировки.
+    """
+    settings.USER_COMMENTS_ON_PAGE = COMMENTS_ON_DETAIL_PAGE
+    params = {}
+    if direction:
+        params[direction] = first_page_cursor(parametrized_client, url)[
+            direction
+        ]
+        assert params[direction]
+        cache.clear()
+    selects = view_selects(parametrized_client, url, table, **params)
+    assert selects
+    for sql in selects:
+        plan = query_plan(sql)
+        assert index_name in plan, (sql, plan)
+        assert 'TEMP B-TREE' not in plan, (sql, plan)
+
+
+@pytest.mark.parametrize(
+    'parametrized_client, method, url',
+    (
+        (CLIENT, 'get', NEWS_HOME_URL),
+        (CLIENT, 'get', NEWS_DETAIL_URL),
+        (AUTHOR_CLIENT, 'get', NEWS_HOME_URL),
+        (AUTHOR_CLIENT, 'get', NEWS_DETAIL_URL),
+        (AUTHOR_CLIENT, 'post', NEWS_DETAIL_URL),
+        (AUTHOR_CLIENT, 'get', USER_COMMENTS_URL),
+        (AUTHOR_CLIENT, 'get', COMMENT_EDIT_URL),
+        (AUTHOR_CLIENT, 'post', COMMENT_EDIT_URL),
+        (AUTHOR_CLIENT, 'get', COMMENT_DELETE_URL),
+        (AUTHOR_CLIENT, 'post', COMMENT_DELETE_URL),
+    ),
+)
+def test_views_fit_query_budgets(
+    parametrized_client, method, url, news_on_home_page, form_data
+):
+    """Страницы укладываются в бюджеты запросов из настроек."""
+    response = getattr(parametrized_client, method)(url, data=form_data)
+    assert_query_budget(response)
+    assert 'db;dur=' in response['Server-Timing']
+
+
+def test_query_budget_overrun_fails(client, news_home_url, settings):
+    """Превышение бюджета роняет тест."""
+    settings.QUERY_BUDGETS = {'news:home': 0}
+    response = client.get(news_home_url)
+    with pytest.raises(AssertionError, match='news:home'):
+        assert_query_budget(response)
+
+
+@pytest.mark.parametrize(
+    'method, url',
+    (
+        ('post', NEWS_DETAIL_URL),
+        ('get', COMMENT_EDIT_URL),
+        ('post', COMMENT_EDIT_URL),
+        ('get', COMMENT_DELETE_URL),
+        ('post', COMMENT_DELETE_URL),
+    ),
+)
+def test_comment_writes_skip_news_text(author_client, method, url, form_data):
+    """Запись комментария не читает полный текст новости."""
+    with CaptureQueriesContext(connection) as context:
+        getattr(author_client, method)(url, data=form_data)
+    selects = [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT')
+    ]
+    assert not any('"news_news"."text"' in sql for sql in selects), selects
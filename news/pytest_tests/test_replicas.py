@@ -0,0 +1,87 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connections
+from news.models import Comment, News
+from yanews.routers import sync_replicas
+
+from .conftest import COMMENT_TEXT
+
+REPLICA = 'lagging_replica'
+
+# Реплика — копия основной базы, снятая через backup API: в ней должны
+# быть закоммиченные данные.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """Второй файл SQLite в роли реплики, пока с пустыми таблицами."""
+    connections.settings[REPLICA] = {
+        **connections['default'].settings_dict,
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = [REPLICA]
+    sync_replicas()
+    yield
+    connections[REPLICA].close()
+    del connections.settings[REPLICA]
+    delattr(connections._connections, REPLICA)
+
+
+def change_title_quietly(news, title):
+    """Меняет заголовок в основной базе, не сдвигая версий кэша."""
+    with connections['default'].cursor() as cursor:
+        cursor.execute(
+            'UPDATE news_news SET title = %s WHERE id = %s', [title, news.pk]
+        )
+
+
+def test_pages_read_from_replica(replica, client, news, news_detail_url):
+    """Страницы читают реплику, а код вне запроса — основную базу."""
+    client.get(news_detail_url)
+    sync_replicas()
+    change_title_quietly(news, 'Только в основной базе')
+    response = client.get(news_detail_url)
+    assert news.title in response.content.decode()
+    assert News.objects.get(pk=news.pk).title == 'Только в основной базе'
+
+
+def test_lagging_replica_is_not_cached(
+    replica, client, author, news, news_detail_url
+):
+    """Реплика, скопированная до изменения, не читается под новой версией."""
+    client.get(news_detail_url)
+    sync_replicas()
+    Comment.objects.create(news=news, author=author, text=COMMENT_TEXT)
+    response = client.get(news_detail_url)
+    assert COMMENT_TEXT in response.content.decode()
+    # Страницы без изменений по-прежнему читают реплику.
+    change_title_quietly(news, 'Только в основной базе')
+    sync_replicas()
+    cached = client.get(news_detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_author_sees_own_comment(
+    replica, settings, author_client, not_author_client, news,
+    news_detail_url, form_data
+):
+    sync_replicas()
+    not_author_client.get(news_detail_url)
+    response = author_client.post(news_detail_url, data=form_data)
+    assert response.status_code == HTTPStatus.FOUND
+    pin = response.cookies[settings.REPLICA_PIN_COOKIE]
+    assert pin['max-age'] == settings.REPLICA_PIN_SECONDS
+    assert COMMENT_TEXT in author_client.get(response.url).content.decode()
+    # Реплика ещё не получила комментарий, поэтому другие читатели
+    # новой версии читают основную базу, а не отстающую копию.
+    fresh = not_author_client.get(news_detail_url)
+    assert COMMENT_TEXT in fresh.content.decode()
+
+
+def test_reads_do_not_pin(replica, client, news, news_detail_url):
+    sync_replicas()
+    response = client.get(news_detail_url)
+    assert response.status_code == HTTPStatus.OK
+    assert not response.cookies
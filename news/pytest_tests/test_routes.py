@@ -1,6 +1,11 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils.crypto import get_random_string
+from news.models import Comment, News
 from pytest_django.asserts import assertRedirects
 
 from .conftest import (
@@ -10,6 +15,7 @@ from .conftest import (
     NEWS_DETAIL_URL,
     NEWS_HOME_URL,
     NOT_AUTHOR_CLIENT,
+    USER_COMMENTS_URL,
     USERS_LOGIN_URL,
     USERS_LOGOUT_URL,
     USERS_SIGHNUP_URL,
@@ -65,13 +71,94 @@ def test_pages_availability_for_different_users(
 
 @pytest.mark.parametrize(
     'url',
-    (COMMENT_EDIT_URL, COMMENT_DELETE_URL),
+    (COMMENT_EDIT_URL, COMMENT_DELETE_URL, USER_COMMENTS_URL),
 )
 def test_redirects(client, url, users_login_url):
     """
     При попытке перейти на страницу редактирования или удаления комментария
-    анонимный пользователь перенаправляется на страницу авторизации.
+    или на страницу своих комментариев анонимный пользователь
+    перенаправляется на страницу авторизации.
     """
     expected_url = f'{users_login_url}?next={url}'
     response = client.get(url)
     assertRedirects(response, expected_url)
+
+
+@pytest.mark.parametrize('url', (NEWS_HOME_URL, NEWS_DETAIL_URL))
+def test_conditional_get(
+    client, author_client, url, author, news, django_assert_num_queries
+):
+    """
+    Неизменённая страница отдаётся как 304 без запросов к базе,
+    а валидаторы различаются для анонима и авторизованного пользователя.
+    """
+    response = client.get(url)
+    etag = response['ETag']
+    assert 'Last-Modified' in response
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    Comment.objects.create(news=news, author=author, text='Текст')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_login_changes_etag(author_client, news_detail_url, settings):
+    """Новый вход меняет токен CSRF в форме, а с ним и ETag страницы."""
+    # Первый ответ ставит cookie CSRF, с которой пойдут следующие запросы.
+    author_client.get(news_detail_url)
+    etag = author_client.get(news_detail_url)['ETag']
+    response = author_client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    # Так меняет cookie rotate_token() при входе.
+    author_client.cookies[settings.CSRF_COOKIE_NAME] = get_random_string(64)
+    response = author_client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_bulk_update_changes_news_etag(client, news, news_detail_url):
+    """Массовое изменение новостей меняет и валидаторы их страниц."""
+    etag = client.get(news_detail_url)['ETag']
+    News.objects.filter(pk=news.pk).update(text='Исправленный текст')
+    response = client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert 'Исправленный текст' in response.content.decode()
+
+
+@pytest.mark.parametrize('url', (NEWS_HOME_URL, NEWS_DETAIL_URL))
+def test_anonymous_responses_are_shared(
+    client, author_client, url, django_assert_num_queries
+):
+    """
+    Анонимный ответ не зависит от посторонних cookie и не трогает сессию,
+    а страница вошедшего пользователя остаётся личной.
+    """
+    client.cookies['_ga'] = 'GA1.1.1'
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert 'Cookie' not in response.get('Vary', '')
+    assert response['Cache-Control'] == 'public, no-cache'
+    assert not response.cookies
+    assert not any('django_session' in query['sql'] for query in queries)
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    response = author_client.get(url)
+    assert 'Cookie' in response['Vary']
+    assert response['Cache-Control'] == 'private'
+
+
+def test_signed_cookie_sessions(settings, author, news_home_url):
+    """
+    С сессиями в подписанной cookie вошедший пользователь не читает
+    таблицу сессий.
+    """
+    settings.SESSION_ENGINE = settings.SESSION_ENGINES['cookies']
+    client = Client()
+    client.force_login(author)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(news_home_url)
+    assert response.context['user'] == author
+    assert not any('django_session' in query['sql'] for query in queries)
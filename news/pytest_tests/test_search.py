@@ -0,0 +1,49 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from news.models import Comment, News
+from news.search import COMMENT, NEWS, search
+
+SEARCH_URL = reverse('news:search')
+
+
+def test_search_finds_word_forms(client, author):
+    """Поиск учитывает словоформы, ё и подсвечивает совпадения."""
+    news = News.objects.create(title='Ёлки в городе', text='Нарядные ёлки.')
+    Comment.objects.create(
+        news=news, author=author, text='Новостями про ёлку <b>доволен</b>'
+    )
+    response = client.get(SEARCH_URL, {'q': 'ёлка'})
+    results = response.context['results']
+    assert [(hit.kind, hit.news_id) for hit in results] == [
+        (NEWS, news.pk), (COMMENT, news.pk),
+    ]
+    content = response.content.decode()
+    assert '<mark>Елки</mark>' in content
+    assert '&lt;b&gt;доволен&lt;/b&gt;' in content
+
+
+def test_search_follows_changes_and_rebuild(author, news, comment):
+    """Индекс следует за изменениями, в том числе массовыми."""
+    assert not search('пингвин').hits
+    News.objects.bulk_create([News(title='Пингвины', text='Текст')])
+    assert len(search('пингвин')) == 1
+    comment.text = 'Пингвин в зоопарке'
+    comment.save()
+    assert len(search('пингвин')) == 2
+    News.objects.filter(title='Пингвины').delete()
+    call_command('rebuild_search_index', stdout=StringIO())
+    assert [hit.kind for hit in search('пингвин')] == [COMMENT]
+
+
+def test_search_pages_by_cursor(news_on_home_page):
+    """Страницы результатов идут по курсору без повторов."""
+    first = search('новость', per_page=4)
+    assert first.has_next
+    seen = [hit.object_id for hit in first]
+    page = first
+    while page.has_next:
+        page = search('новость', cursor=page.next_cursor, per_page=4)
+        seen += [hit.object_id for hit in page]
+    assert sorted(seen) == sorted(News.objects.values_list('pk', flat=True))
@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+from django.conf import settings
+from django.db import OperationalError, connection
+from yanews.sqlite.base import DatabaseWrapper
+
+WRITERS = 4
+WRITES = 25
+
+
+def connect(path, tuned, timeout):
+    return DatabaseWrapper({
+        **connection.settings_dict,
+        'NAME': str(path),
+        'OPTIONS': {'timeout': timeout},
+        'PRAGMAS': settings.SQLITE_PRAGMAS if tuned else {},
+        'TRANSACTION_MODE': 'IMMEDIATE' if tuned else None,
+    })
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / 'stress.sqlite3'
+    setup = connect(path, tuned=False, timeout=1)
+    with setup.cursor() as cursor:
+        cursor.execute(
+            'CREATE TABLE item (id integer PRIMARY KEY, value text)'
+        )
+        cursor.execute("INSERT INTO item (value) VALUES ('первая')")
+    setup.close()
+    return path
+
+
+def write(db, value):
+    """Чтение и запись в одной транзакции, как в atomic() представления."""
+    db._start_transaction_under_autocommit()
+    with db.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM item')
+        cursor.execute('INSERT INTO item (value) VALUES (%s)', [value])
+    db.commit()
+
+
+def hold_read_snapshot(db):
+    """Долгое чтение: обычный BEGIN не берёт блокировку записи."""
+    with db.cursor() as cursor:
+        cursor.execute('BEGIN')
+        cursor.execute('SELECT count(*) FROM item')
+        return cursor.fetchone()[0]
+
+
+def test_tuned_connection_pragmas(database):
+    db = connect(database, tuned=True, timeout=1)
+    with db.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        assert cursor.fetchone()[0] == 'wal'
+        cursor.execute('PRAGMA synchronous')
+        assert cursor.fetchone()[0] == 1
+    assert db.is_usable()
+    db.close()
+
+
+def test_reader_blocks_writer_by_default(database):
+    reader = connect(database, tuned=False, timeout=0.1)
+    hold_read_snapshot(reader)
+    writer = connect(database, tuned=False, timeout=0.1)
+    with pytest.raises(OperationalError, match='locked'):
+        write(writer, 'вторая')
+    reader.rollback()
+    reader.close()
+    writer.close()
+
+
+def test_readers_and_writers_do_not_block_each_other(database):
+    """
+    Под профилем WAL писатели работают при открытом чтении,
+    а друг друга ждут в очереди блокировки, не получая ошибок.
+    """
+    reader = connect(database, tuned=True, timeout=1)
+    assert hold_read_snapshot(reader) == 1
+    errors = []
+
+    def writer(number):
+        db = connect(database, tuned=True, timeout=5)
+        try:
+            for index in range(WRITES):
+                write(db, f'{number}-{index}')
+        except OperationalError as error:
+            errors.append(error)
+        finally:
+            db.close()
+
+    threads = [
+        threading.Thread(target=writer, args=(number,))
+        for number in range(WRITERS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    with reader.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM item')
+        assert cursor.fetchone()[0] == 1
+    reader.rollback()
+    with reader.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM item')
+        assert cursor.fetchone()[0] == 1 + WRITERS * WRITES
+    reader.close()
+
+
+def test_health_check_once_per_request(monkeypatch, database):
+    """
+    Постоянное соединение проверяется при первом обращении запроса, а не
+    на каждом сигнале начала и конца запроса.
+    """
+    checks = []
+    monkeypatch.setattr(
+        DatabaseWrapper, 'is_usable', lambda db: checks.append(db) or True
+    )
+    db = connect(database, tuned=False, timeout=1)
+    db.settings_dict.update(CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+    for _ in range(2):
+        db.close_if_unusable_or_obsolete()
+        for _ in range(2):
+            with db.cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM item')
+        db.close_if_unusable_or_obsolete()
+    assert len(checks) == 1
+    db.close()
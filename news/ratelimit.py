@@ -0,0 +1,169 @@
+"""Ограничение частоты записи комментариев.
+
+Добавление, правка и удаление комментария берут по жетону из ведра
+пользователя и ведра IP-адреса, размеры которых заданы в
+``settings.COMMENT_RATE_LIMITS``. Жетоны берутся, только если их хватает
+во всех вёдрах: пользователь сверх своего лимита не расходует общее
+ведро адреса. Если жетонов нет, запрос получает ответ 429 с заголовком
+``Retry-After``, не обращаясь к базе. Поэтому всплеск спама не доходит
+до единственного пишущего соединения SQLite.
+
+Пользователь определяется по ключу сессии из cookie, не читая саму
+сессию, так что лимит ``'user'`` на самом деле действует на сессию: у
+вошедшего с нескольких устройств у каждой сессии своё ведро. Запросы
+без cookie сессии не ограничиваются: их всё равно перенаправят на
+страницу входа. Новый вход меняет ключ сессии, но сам вход стоит
+проверки пароля. IP берётся из ``REMOTE_ADDR`` или, за
+обратным прокси, из заголовка ``settings.CLIENT_IP_HEADER``. Без этого
+заголовка у всех запросов был бы адрес прокси, поэтому ограничение по
+IP по умолчанию выключено.
+
+Ведро хранится одним числом — временем, когда оно снова наполнится
+(алгоритм GCRA). Это тот же token bucket: ``rate`` жетонов за ``period``
+секунд и всплеск до ``rate`` запросов подряд, но без отдельного счётчика
+жетонов и фонового пополнения.
+
+Где хранятся вёдра, определяет ``settings.COMMENT_RATE_LIMITER``:
+
+* :class:`LocalBuckets` — словарь в памяти процесса. Блокировки
+  разбиты на полосы, поэтому потоки с разными ключами не ждут друг друга.
+  Годится для одного процесса и для разработки;
+* :class:`CacheBuckets` — кэш Django ``RATE_LIMIT_CACHE``, общий для
+  процессов. Чтение и запись ведра не атомарны, поэтому одновременные
+  запросы одного пользователя из разных процессов могут получить на
+  несколько жетонов больше.
+"""
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+Limit = namedtuple('Limit', ('rate', 'period'))
+
+
+def advance(full_at, now, limit):
+    """
+    Берёт жетон из ведра, которое наполнится к ``full_at``.
+
+    Возвращает новое значение ведра и ``0``. Если жетонов нет, возвращает
+    прежнее значение и число секунд до появления жетона.
+    """
+    interval = limit.period / limit.rate
+    if full_at is None or full_at < now:
+        full_at = now
+    wait = full_at + interval - limit.period - now
+    if wait > 0:
+        return full_at, wait
+    return full_at + interval, 0
+
+
+class LocalBuckets:
+    """Вёдра в памяти процесса."""
+    STRIPES = 64
+    # Сколько вёдер храним, прежде чем выбросить наполнившиеся: они
+    # ничем не отличаются от отсутствующих.
+    MAX_BUCKETS = 10_000
+
+    def __init__(self):
+        self.buckets = {}
+        self.locks = [threading.Lock() for _ in range(self.STRIPES)]
+        self.prune_lock = threading.Lock()
+        self.prune_at = self.MAX_BUCKETS
+
+    def take(self, key, limit, consume=True):
+        now = time.monotonic()
+        with self.locks[hash(key) % self.STRIPES]:
+            full_at, wait = advance(self.buckets.get(key), now, limit)
+            if consume and not wait:
+                self.buckets[key] = full_at
+        if (
+            len(self.buckets) > self.prune_at
+            and self.prune_lock.acquire(blocking=False)
+        ):
+            try:
+                self.prune(now)
+            finally:
+                self.prune_lock.release()
+        return wait
+
+    def prune(self, now):
+        """Выбрасывает наполнившиеся вёдра; чистит их один поток."""
+        for key in list(self.buckets):
+            with self.locks[hash(key) % self.STRIPES]:
+                if self.buckets.get(key, now) <= now:
+                    del self.buckets[key]
+        self.prune_at = max(self.MAX_BUCKETS, 2 * len(self.buckets))
+
+
+class CacheBuckets:
+    """Вёдра в кэше Django, общие для процессов."""
+
+    def __init__(self):
+        self.cache = caches[settings.RATE_LIMIT_CACHE]
+
+    def take(self, key, limit, consume=True):
+        now = time.time()
+        key = f'ratelimit:{key}'
+        full_at, wait = advance(self.cache.get(key), now, limit)
+        if consume and not wait:
+            # Наполнившееся ведро не нужно хранить.
+            self.cache.set(key, full_at, timeout=ceil(full_at - now))
+        return wait
+
+
+@lru_cache(maxsize=None)
+def get_limiter(path):
+    return import_string(path)()
+
+
+def client_ip(request):
+    """
+    Адрес клиента. Из заголовка прокси берётся последнее значение:
+    его добавил наш прокси, а предыдущие мог прислать сам клиент.
+    """
+    if settings.CLIENT_IP_HEADER:
+        forwarded = request.META.get(settings.CLIENT_IP_HEADER, '')
+        if forwarded:
+            return forwarded.rsplit(',', 1)[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def request_buckets(request):
+    """Вёдра запроса с их лимитами: сначала пользователя, потом IP."""
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return []
+    limits = settings.COMMENT_RATE_LIMITS
+    keys = {'user': session_key, 'ip': client_ip(request)}
+    return [
+        (f'comments:{kind}:{value}', Limit(*limits[kind]))
+        for kind, value in keys.items()
+        if limits.get(kind) is not None
+    ]
+
+
+def retry_after(request):
+    """
+    Берёт жетоны для изменяющего запроса.
+
+    Возвращает ``0``, если запрос можно выполнять, иначе — через сколько
+    секунд повторить. Пока во всех вёдрах не хватает жетонов, ни одно
+    из них не расходуется.
+    """
+    limiter = get_limiter(settings.COMMENT_RATE_LIMITER)
+    buckets = request_buckets(request)
+    wait = max(
+        (limiter.take(key, limit, consume=False) for key, limit in buckets),
+        default=0,
+    )
+    if wait:
+        return wait
+    # Между проверкой и списанием другой запрос мог забрать жетон.
+    return max(
+        (limiter.take(key, limit) for key, limit in buckets), default=0
+    )
@@ -0,0 +1,261 @@
+"""Полнотекстовый поиск по новостям и комментариям на SQLite FTS5.
+
+Таблица ``news_search`` создаётся миграцией и поддерживается триггерами
+на уровне базы, поэтому в индекс попадают и массовые операции, которые
+не отправляют сигналы Django. Русская морфология учитывается на стороне
+запроса: каждое слово сводится к основе стеммером Snowball и ищется как
+префикс, так что «новости» находит и «новость», и «новостями».
+"""
+import re
+from dataclasses import dataclass
+
+import snowballstemmer
+from django.db import connections
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import CommentStatus, News
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+NEWS = 'news'
+COMMENT = 'comment'
+
+# Границы подсветки — управляющие символы, которых нет в тексте:
+# сниппет сначала экранируется целиком, а потом они меняются на <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-яё]')
+
+stemmers = {
+    'russian': snowballstemmer.stemmer('russian'),
+    'english': snowballstemmer.stemmer('english'),
+}
+
+
+def fold(text):
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def _trigger(name, event, table, body):
+    return (
+        f'CREATE TRIGGER IF NOT EXISTS {name} {event} ON {table} '
+        f'BEGIN {body} END'
+    )
+
+
+NEWS_ROW = (
+    "new.id * 2, replace(replace(new.title, 'ё', 'е'), 'Ё', 'Е'), "
+    "replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'), new.id"
+)
+COMMENT_ROW = (
+    "new.id * 2 + 1, '', "
+    "replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'), new.news_id"
+)
+INSERT = 'INSERT INTO news_search(rowid, title, body, news_id) VALUES ({});'
+# В индекс попадают только опубликованные комментарии.
+PUBLISHED = f'new.status = {CommentStatus.PUBLISHED}'
+INSERT_PUBLISHED = (
+    'INSERT INTO news_search(rowid, title, body, news_id) '
+    f'SELECT {{}} WHERE {PUBLISHED};'
+)
+
+TRIGGERS_SQL = (
+    _trigger(
+        'news_search_news_insert', 'AFTER INSERT', 'news_news',
+        INSERT.format(NEWS_ROW),
+    ),
+    _trigger(
+        'news_search_news_update', 'AFTER UPDATE OF title, text', 'news_news',
+        'DELETE FROM news_search WHERE rowid = old.id * 2; '
+        + INSERT.format(NEWS_ROW),
+    ),
+    _trigger(
+        'news_search_news_delete', 'AFTER DELETE', 'news_news',
+        'DELETE FROM news_search WHERE rowid = old.id * 2;',
+    ),
+    _trigger(
+        'news_search_comment_insert', 'AFTER INSERT', 'news_comment',
+        INSERT_PUBLISHED.format(COMMENT_ROW),
+    ),
+    _trigger(
+        'news_search_comment_update', 'AFTER UPDATE OF text, news_id, status',
+        'news_comment',
+        'DELETE FROM news_search WHERE rowid = old.id * 2 + 1; '
+        + INSERT_PUBLISHED.format(COMMENT_ROW),
+    ),
+    _trigger(
+        'news_search_comment_delete', 'AFTER DELETE', 'news_comment',
+        'DELETE FROM news_search WHERE rowid = old.id * 2 + 1;',
+    ),
+)
+
+REBUILD_SQL = (
+    'DELETE FROM news_search',
+    """
+    INSERT INTO news_search(rowid, title, body, news_id)
+    SELECT id * 2, replace(replace(title, 'ё', 'е'), 'Ё', 'Е'),
+           replace(replace(text, 'ё', 'е'), 'Ё', 'Е'), id
+    FROM news_news
+    """,
+    f"""
+    INSERT INTO news_search(rowid, title, body, news_id)
+    SELECT id * 2 + 1, '', replace(replace(text, 'ё', 'е'), 'Ё', 'Е'), news_id
+    FROM news_comment
+    WHERE status = {CommentStatus.PUBLISHED}
+    """,
+    "INSERT INTO news_search(news_search) VALUES ('optimize')",
+)
+
+SEARCH_SQL = """
+    SELECT rowid, news_id, rank,
+           highlight(news_search, 0, char(2), char(3)),
+           snippet(news_search, 1, char(2), char(3), '…', 24)
+    FROM news_search
+    WHERE news_search MATCH %s {seek}
+    ORDER BY rank, rowid
+    LIMIT %s
+"""
+SEEK_SQL = 'AND (rank > %s OR (rank = %s AND rowid > %s))'
+
+MATCHING_IDS_SQL = """
+    SELECT rowid / 2
+    FROM news_search
+    WHERE news_search MATCH %s AND rowid %% 2 = %s
+    ORDER BY rank, rowid
+    LIMIT %s
+"""
+
+
+def is_available(using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    return 'news_search' in connection.introspection.table_names()
+
+
+def install_triggers(using='default', **kwargs):
+    """Ставит недостающие триггеры; подключён к сигналу post_migrate."""
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        for statement in TRIGGERS_SQL:
+            cursor.execute(statement)
+
+
+def rebuild(using='default'):
+    install_triggers(using)
+    with connections[using].cursor() as cursor:
+        for statement in REBUILD_SQL:
+            cursor.execute(statement)
+
+
+def stem(word):
+    language = 'russian' if CYRILLIC_RE.search(word) else 'english'
+    return stemmers[language].stemWord(word)
+
+
+def build_match(query):
+    """
+    Выражение MATCH из пользовательского запроса.
+
+    Берутся только слова, поэтому синтаксис FTS5 из запроса не утекает
+    в выражение; все слова обязательны, каждое ищется по основе.
+    """
+    stems = [stem(fold(word.lower())) for word in WORD_RE.findall(query)]
+    return ' '.join(f'"{word}"*' for word in stems if word)
+
+
+def highlight(text):
+    return mark_safe(
+        escape(text)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+@dataclass
+class SearchHit:
+    kind: str
+    object_id: int
+    news_id: int
+    rank: float
+    title: str
+    snippet: str
+    news_title: str = ''
+
+
+@dataclass
+class SearchPage:
+    hits: list
+    next_cursor: str = None
+
+    def __iter__(self):
+        return iter(self.hits)
+
+    def __len__(self):
+        return len(self.hits)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def search(query, cursor=None, per_page=20, using='default'):
+    """
+    Страница результатов по релевантности (bm25, заголовок весомее).
+
+    Следующая страница начинается после курсора ``(rank, rowid)``,
+    поэтому её стоимость не зависит от номера страницы.
+    """
+    match = build_match(query)
+    if not match:
+        return SearchPage(hits=[])
+    params = [match]
+    seek = ''
+    if cursor:
+        rank, rowid = decode_cursor(cursor, 2)
+        if not isinstance(rank, (int, float)) or not isinstance(rowid, int):
+            raise InvalidCursor(cursor)
+        seek = SEEK_SQL
+        params += [rank, rank, rowid]
+    params.append(per_page + 1)
+    with connections[using].cursor() as db_cursor:
+        db_cursor.execute(SEARCH_SQL.format(seek=seek), params)
+        rows = db_cursor.fetchall()
+    hits = [
+        SearchHit(
+            kind=COMMENT if rowid % 2 else NEWS,
+            object_id=rowid // 2,
+            news_id=news_id,
+            rank=rank,
+            title=highlight(title),
+            snippet=highlight(snippet),
+        )
+        for rowid, news_id, rank, title, snippet in rows[:per_page]
+    ]
+    titles = dict(
+        News.objects.using(using)
+        .filter(pk__in={hit.news_id for hit in hits})
+        .values_list('pk', 'title')
+    )
+    for hit in hits:
+        hit.news_title = titles.get(hit.news_id, '')
+    next_cursor = None
+    if len(rows) > per_page:
+        last = rows[per_page - 1]
+        next_cursor = encode_cursor([last[2], last[0]])
+    return SearchPage(hits=hits, next_cursor=next_cursor)
+
+
+def matching_ids(kind, query, limit, using='default'):
+    """Номера новостей или опубликованных комментариев по релевантности."""
+    match = build_match(query)
+    if not match:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            MATCHING_IDS_SQL, [match, int(kind == COMMENT), limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
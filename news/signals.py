@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_news_version, bump_news_list_version
+from .forms import bad_words
+from .models import BadWord, Comment, CommentStatus, News
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, raw=False, **kwargs):
+    """
+    Новый опубликованный комментарий увеличивает счётчик у новости.
+
+    Прошедшие модерацию комментарии учитывает news.moderation.
+    """
+    if raw or not created or instance.status != CommentStatus.PUBLISHED:
+        return
+    News.objects.filter(pk=instance.news_id).change_comment_count(1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """Удалённый опубликованный комментарий уменьшает счётчик у новости."""
+    if instance.status != CommentStatus.PUBLISHED:
+        return
+    News.objects.filter(
+        pk=instance.news_id, comment_count__gt=0
+    ).change_comment_count(-1)
+
+
+@receiver((post_save, post_delete), sender=BadWord)
+def reload_bad_words(sender, **kwargs):
+    """Изменённый список слов применяется без перезапуска."""
+    bad_words.invalidate()
+
+
+@receiver((post_save, post_delete), sender=News)
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_news_list(sender, **kwargs):
+    """Любое изменение новостей и комментариев меняет список."""
+    bump_news_list_version()
+
+
+@receiver((post_save, post_delete), sender=News)
+def invalidate_news(sender, instance, **kwargs):
+    """Страница новости зависит от самой новости и её комментариев."""
+    bump_news_version(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    """Комментарии выводятся на странице своей новости."""
+    bump_news_version(instance.news_id)
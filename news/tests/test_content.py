@@ -33,7 +33,7 @@ class TestHomePage(TestCase):
         """Количество новостей на главной странице — не более 10."""
         response = self.client.get(self.HOME_URL)
         object_list = response.context['object_list']
-        new_count = object_list.count()
+        new_count = len(object_list)
         self.assertEqual(new_count, settings.NEWS_COUNT_ON_HOME_PAGE)
 
     def test_news_order(self):
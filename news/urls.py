@@ -1,16 +1,65 @@
+from django.conf import settings
 from django.urls import path
 
-from news import views
+from news import api, views
+
+if settings.ASYNC_VIEWS:
+    from news import async_views as pages
+else:
+    pages = views
 
 app_name = 'news'
 
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', pages.NewsList.as_view(), name='home'),
+    path('news/<int:pk>/', pages.NewsDetailView.as_view(), name='detail'),
+    path(
+        'archive/<int:year>/',
+        pages.NewsArchive.as_view(),
+        name='archive_year'
+    ),
+    path(
+        'archive/<int:year>/<int:month>/',
+        pages.NewsArchive.as_view(),
+        name='archive_month'
+    ),
+    path(
+        'archive/<int:year>/<int:month>/<int:day>/',
+        pages.NewsArchive.as_view(),
+        name='archive_day'
+    ),
+    path(
+        'news/<int:pk>/events/',
+        views.NewsEvents.as_view(),
+        name='events'
+    ),
+    path('search/', views.NewsSearch.as_view(), name='search'),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
         name='delete'
     ),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
+    path(
+        'my_comments/',
+        views.UserComments.as_view(),
+        name='user_comments'
+    ),
+    path('export/<str:kind>/', views.Export.as_view(), name='export'),
+    path(
+        'moderation/',
+        views.ModerationStatus.as_view(),
+        name='moderation'
+    ),
+    path('api/news/', api.NewsListApi.as_view(), name='api_news_list'),
+    path(
+        'api/news/<int:pk>/',
+        api.NewsDetailApi.as_view(),
+        name='api_news_detail'
+    ),
+    path(
+        'api/news/<int:pk>/comments/',
+        api.CommentListApi.as_view(),
+        name='api_comments'
+    ),
 ]
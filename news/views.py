@@ -1,39 +1,258 @@
+import hashlib
+from datetime import date, timedelta
+from http import HTTPStatus
+from math import ceil
+
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db import transaction
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
 from django.views import generic
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from .cache import (
+    get_or_render_comments,
+    get_or_render_news_list,
+    news_list_version,
+    news_version,
+    version_to_datetime,
+)
+from .export import FORMATS, NDJSON, ExportError, export
+from .forms import CommentForm, PendingCommentForm
+from .live import publish_comments
+from .models import Comment, CommentStatus, News
+from .moderation import moderation_stats
+from .pagination import AFTER, BEFORE, InvalidCursor, KeysetPaginator
+from .ratelimit import retry_after
+from .search import search
+
+COMMENT_CONTROLS = '<!-- comment-controls:{pk} -->'
+
+
+def viewer_etag(version, request):
+    """
+    Значение ETag из версии данных и зрителя.
+
+    Авторизованные пользователи видят свою шапку, форму и ссылки
+    редактирования, поэтому их ответы не должны совпадать с анонимными.
+    В формы вшит токен CSRF, который меняется при каждом входе: с ним в
+    ETag входит отпечаток секрета CSRF, иначе ответ 304 оставил бы в
+    браузере страницу со старым токеном, и следующий POST не прошёл бы.
+    """
+    if not request.user.is_authenticated:
+        return f'{version}-0'
+    csrf_digest = hashlib.md5(
+        request.META.get('CSRF_COOKIE', '').encode()
+    ).hexdigest()[:12]
+    return f'{version}-{request.user.pk}-{csrf_digest}'
+
+
+def news_list_etag(request, *args, **kwargs):
+    return viewer_etag(news_list_version(), request)
+
+
+def news_list_last_modified(request, *args, **kwargs):
+    return version_to_datetime(news_list_version())
+
+
+def news_detail_etag(request, pk, **kwargs):
+    return viewer_etag(news_version(pk), request)
+
 
-from .forms import CommentForm
-from .models import Comment, News
+def news_detail_last_modified(request, pk, **kwargs):
+    return version_to_datetime(news_version(pk))
 
 
-class NewsList(generic.ListView):
-    """Список новостей."""
+news_list_condition = condition(news_list_etag, news_list_last_modified)
+news_detail_condition = condition(news_detail_etag, news_detail_last_modified)
+
+
+class KeysetPageMixin:
+    """Выбор страницы по курсору из параметров запроса."""
+
+    def get_keyset_page(self, paginator, from_end=False):
+        before = self.request.GET.get(BEFORE)
+        after = self.request.GET.get(AFTER)
+        cursor, direction = (before, BEFORE) if before else (after, AFTER)
+        try:
+            return paginator.page(cursor, direction, from_end=from_end)
+        except InvalidCursor:
+            raise Http404('Неверный курсор страницы.')
+
+
+@method_decorator((vary_on_cookie, news_list_condition), name='get')
+class NewsList(KeysetPageMixin, generic.ListView):
+    """
+    Список новостей.
+
+    Версия списка в кэше служит валидатором: на условный запрос без
+    изменений отвечаем 304, не обращаясь к базе и не рисуя шаблон.
+    """
     model = News
     template_name = 'news/home.html'
 
     def get_queryset(self):
         """
-        Выводим только несколько последних новостей.
+        Выводим одну страницу новостей, начиная с самых свежих.
 
-        Их количество определяется в настройках проекта.
+        Размер страницы определяется в настройках проекта.
+        Полный текст в списке не нужен: выводится готовый анонс.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.defer('text')
 
+    def get_context_data(self, **kwargs):
+        """
+        Разметка списка берётся из кэша.
 
-class NewsDetail(generic.DetailView):
-    model = News
-    template_name = 'news/detail.html'
+        Страница читается из базы лениво, поэтому при попадании в кэш
+        запросов к новостям нет вовсе, а шапка всё равно рисуется
+        для текущего пользователя.
+        """
+        page = self.get_keyset_page(KeysetPaginator(
+            self.object_list,
+            ('-date', '-id'),
+            settings.NEWS_COUNT_ON_HOME_PAGE,
+        ))
+        context = super().get_context_data(object_list=page, **kwargs)
+        context['page_obj'] = page
+        context['news_list_html'] = mark_safe(get_or_render_news_list(
+            self.get_cache_key_parts(),
+            lambda: render_to_string('includes/news_list.html', context),
+        ))
+        return context
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
+    def get_cache_key_parts(self):
+        return (
+            self.request.path,
+            self.request.GET.get(BEFORE, ''),
+            self.request.GET.get(AFTER, ''),
         )
-        return obj
+
+
+class NewsArchive(NewsList):
+    """Новости за год, месяц или день."""
+
+    def get_period(self):
+        year = self.kwargs['year']
+        month = self.kwargs.get('month')
+        day = self.kwargs.get('day')
+        try:
+            start = date(year, month or 1, day or 1)
+            if day:
+                end = start + timedelta(days=1)
+            elif month:
+                end = date(year + month // 12, month % 12 + 1, 1)
+            else:
+                end = date(year + 1, 1, 1)
+        except (ValueError, OverflowError):
+            raise Http404('Такой даты не существует.')
+        return start, end
+
+    def get_queryset(self):
+        """Полуинтервал по дате позволяет искать по индексу."""
+        self.start, self.end = self.get_period()
+        return super().get_queryset().filter(
+            date__gte=self.start, date__lt=self.end
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['archive'] = {
+            'start': self.start,
+            'end': self.end - timedelta(days=1),
+        }
+        return context
+
+
+class CommentsPageMixin(KeysetPageMixin):
+    """
+    Одна страница комментариев к новости.
+
+    Без курсора показываются самые свежие комментарии, так что автор
+    только что добавленного комментария сразу видит его на странице.
+
+    Разметка страницы одна для всех читателей и кэшируется до следующего
+    изменения комментариев новости. Ссылки редактирования и удаления
+    подставляются поверх неё по списку авторов, сохранённому рядом.
+    """
+
+    def get_comments_page(self):
+        paginator = KeysetPaginator(
+            Comment.objects.published()
+            .filter(news=self.object)
+            .select_related('author'),
+            ordering=('created', 'id'),
+            per_page=settings.COMMENTS_COUNT_ON_DETAIL_PAGE,
+        )
+        return self.get_keyset_page(paginator, from_end=True)
+
+    def render_comments(self, page):
+        return {
+            'html': render_to_string(
+                'includes/comments.html', {'comments': page}
+            ),
+            'authors': {comment.pk: comment.author_id for comment in page},
+            'last_published_seq': max(
+                (comment.published_seq or 0 for comment in page), default=0
+            ),
+        }
+
+    def get_comments_fragment(self, page):
+        return get_or_render_comments(
+            self.object.pk,
+            (
+                settings.COMMENTS_COUNT_ON_DETAIL_PAGE,
+                self.request.GET.get(BEFORE, ''),
+                self.request.GET.get(AFTER, ''),
+            ),
+            lambda: self.render_comments(page),
+        )
+
+    def get_comments_html(self, fragment):
+        html = fragment['html']
+        user_id = self.request.user.pk
+        for comment_id, author_id in fragment['authors'].items():
+            if author_id == user_id:
+                html = html.replace(
+                    COMMENT_CONTROLS.format(pk=comment_id),
+                    render_to_string(
+                        'includes/comment_controls.html',
+                        {'comment_id': comment_id},
+                    ),
+                )
+        return mark_safe(html)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = self.get_comments_page()
+        fragment = self.get_comments_fragment(page)
+        context['comments'] = page
+        context['comments_html'] = self.get_comments_html(fragment)
+        # Страница без курсора — самые свежие комментарии: с последнего
+        # из них она продолжает получать новые по SSE.
+        context['comments_live'] = not (
+            self.request.GET.get(BEFORE) or self.request.GET.get(AFTER)
+        )
+        context['comments_last_id'] = fragment['last_published_seq']
+        return context
+
+
+class NewsDetail(CommentsPageMixin, generic.DetailView):
+    model = News
+    template_name = 'news/detail.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,8 +261,31 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class CommentRateLimitMixin:
+    """
+    Ограничение частоты записи комментариев, см. ``news.ratelimit``.
+
+    Ставится перед ``LoginRequiredMixin``, чтобы отклонять запросы, не
+    загружая пользователя.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            wait = retry_after(request)
+            if wait:
+                response = HttpResponse(
+                    'Слишком много комментариев, попробуйте позже.',
+                    status=HTTPStatus.TOO_MANY_REQUESTS,
+                )
+                response['Retry-After'] = ceil(wait)
+                return response
+        return super().dispatch(request, *args, **kwargs)
+
+
 class NewsComment(
+        CommentRateLimitMixin,
         LoginRequiredMixin,
+        CommentsPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -52,45 +294,124 @@ class NewsComment(
     template_name = 'news/detail.html'
 
     def post(self, request, *args, **kwargs):
-        self.object = self.get_object()
+        """Для нового комментария достаточно убедиться, что новость есть."""
+        self.object = self.get_object(self.model.objects.only('pk'))
         return super().post(request, *args, **kwargs)
 
+    def get_form_class(self):
+        """При модерации текст проверяет воркер, а не запрос."""
+        if settings.COMMENT_MODERATION:
+            return PendingCommentForm
+        return super().get_form_class()
+
     def form_valid(self, form):
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if settings.COMMENT_MODERATION:
+            comment.status = CommentStatus.PENDING
+            comment.save()
+            messages.info(
+                self.request, 'Комментарий появится после проверки.'
+            )
+        else:
+            comment.save()
+            transaction.on_commit(lambda: publish_comments([comment]))
         return super().form_valid(form)
 
+    def form_invalid(self, form):
+        """Страница с ошибками формы выводит новость целиком."""
+        self.object = self.get_object()
+        return super().form_invalid(form)
+
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        """Страница без курсора заканчивается новым комментарием."""
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
+    detail_view = staticmethod(NewsDetail.as_view())
+    comment_view = staticmethod(NewsComment.as_view())
 
+    @method_decorator((vary_on_cookie, news_detail_condition))
     def get(self, request, *args, **kwargs):
-        view = NewsDetail.as_view()
-        return view(request, *args, **kwargs)
+        return self.detail_view(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
-        view = NewsComment.as_view()
-        return view(request, *args, **kwargs)
+        return self.comment_view(request, *args, **kwargs)
 
 
-class CommentBase(LoginRequiredMixin):
+class NewsEvents(generic.View):
+    """
+    Поток новых комментариев новости.
+
+    Его обслуживает ASGI-обёртка из ``news.live``; без неё, под WSGI,
+    отвечаем 204, и браузер перестаёт переподключаться.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+
+
+class ModerationStatus(
+        LoginRequiredMixin,
+        UserPassesTestMixin,
+        generic.View
+):
+    """Очередь модерации и счётчики воркера для сотрудников."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return JsonResponse(moderation_stats())
+
+
+class NewsSearch(generic.TemplateView):
+    """Поиск по новостям и комментариям."""
+    template_name = 'news/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        try:
+            context['results'] = search(
+                query,
+                cursor=self.request.GET.get(AFTER),
+                per_page=settings.SEARCH_RESULTS_ON_PAGE,
+            )
+        except InvalidCursor:
+            raise Http404('Неверный курсор страницы.')
+        context['query'] = query
+        return context
+
+
+class CommentBase(CommentRateLimitMixin, LoginRequiredMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими комментариями.
+
+        Комментарий читается одним запросом вместе с заголовком новости,
+        который выводят шаблоны; полный текст новости не нужен.
+        """
+        return (
+            self.model.objects.filter(author=self.request.user)
+            .select_related('news')
+            .only(
+                'text', 'created', 'status', 'news_id', 'author_id',
+                'news__title',
+            )
+        )
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -98,7 +419,78 @@ class CommentUpdate(CommentBase, generic.UpdateView):
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def form_valid(self, form):
+        """Форма меняет только текст, его одного и сохраняем."""
+        self.object = form.save(commit=False)
+        self.object.save(update_fields=('text',))
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+
+class UserComments(LoginRequiredMixin, KeysetPageMixin, generic.ListView):
+    """
+    Все комментарии пользователя, от свежих к старым, с заголовками новостей.
+
+    Страница выбирается по курсору индексом ``(author, created, id)``,
+    поэтому число и стоимость запросов не зависят от того, сколько
+    комментариев написал пользователь.
+    """
+    template_name = 'news/user_comments.html'
+
+    def get_queryset(self):
+        return (
+            Comment.objects.filter(author=self.request.user)
+            .select_related('news')
+            .defer('news__text', 'news__teaser')
+        )
+
+    def get_context_data(self, **kwargs):
+        page = self.get_keyset_page(KeysetPaginator(
+            self.object_list,
+            ('-created', '-id'),
+            settings.USER_COMMENTS_ON_PAGE,
+        ))
+        context = super().get_context_data(object_list=page, **kwargs)
+        context['page_obj'] = page
+        context['statuses'] = CommentStatus
+        return context
+
+
+class Export(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """
+    Потоковая выгрузка для аналитиков, доступна только сотрудникам.
+
+    Параметры: ``format`` (ndjson или csv), ``since`` и ``gzip=1``.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, kind):
+        output_format = request.GET.get('format', NDJSON)
+        compress = request.GET.get('gzip') == '1'
+        try:
+            chunks = export(
+                kind,
+                output_format,
+                since=request.GET.get('since'),
+                compress=compress,
+                chunk_size=settings.EXPORT_CHUNK_SIZE,
+            )
+        except ExportError as error:
+            return HttpResponseBadRequest(str(error))
+        filename = f'{kind}.{output_format}'
+        if compress:
+            filename += '.gz'
+            content_type = 'application/gzip'
+        else:
+            content_type = f'{FORMATS[output_format]}; charset=utf-8'
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
@@ -0,0 +1,135 @@
+"""Метрики запроса: SQL, шаблоны и общее время.
+
+Метрики текущего запроса хранятся в ContextVar, чтобы до них могли
+дотянуться обёртка курсора и шаблонный бэкенд, ничего не зная о запросе.
+"""
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates
+from django.template.backends.django import Template as BackendTemplate
+from django.template.backends.django import reraise
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+@dataclass
+class RequestMetrics:
+    url_name: str = None
+    method: str = None
+    queries: int = 0
+    db_time: float = 0.0
+    template_time: float = 0.0
+    total_time: float = 0.0
+    rendering: bool = False
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка для ``connection.execute_wrapper``."""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += perf_counter() - start
+
+    @property
+    def query_budget(self):
+        budgets = settings.QUERY_BUDGETS
+        return budgets.get(
+            f'{self.method} {self.url_name}', budgets.get(self.url_name)
+        )
+
+    @property
+    def over_budget(self):
+        budget = self.query_budget
+        return budget is not None and self.queries > budget
+
+    def as_log(self):
+        return {
+            'url_name': self.url_name,
+            'method': self.method,
+            'queries': self.queries,
+            'query_budget': self.query_budget,
+            'db_ms': round(self.db_time * 1000, 3),
+            'template_ms': round(self.template_time * 1000, 3),
+            'total_ms': round(self.total_time * 1000, 3),
+        }
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.3f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.3f}',
+            f'total;dur={self.total_time * 1000:.3f}',
+        ))
+
+
+@contextmanager
+def track_queries(metrics):
+    """
+    Считает запросы к базе в текущем потоке.
+
+    Обёртки ставятся на соединения того потока, где выполняется код,
+    поэтому пул асинхронных представлений подключает их сам.
+    """
+    with ExitStack() as stack:
+        if metrics is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+        yield
+
+
+class InstrumentedTemplate(BackendTemplate):
+
+    def render(self, context=None, request=None):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.rendering:
+            return super().render(context, request)
+        metrics.rendering = True
+        start = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += perf_counter() - start
+            metrics.rendering = False
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Шаблонный бэкенд Django, который засекает время отрисовки."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            self.engine.from_string(template_code), self
+        )
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def assert_query_budget(response):
+    """
+    Проверка для тестов: ответ уложился в бюджет запросов своего URL.
+
+    Бюджеты задаются в ``settings.QUERY_BUDGETS`` по имени URL или,
+    отдельно для метода, по ключу вида ``'POST news:detail'``.
+    """
+    metrics = response.metrics
+    if metrics.query_budget is None:
+        raise AssertionError(
+            f'Для {metrics.method} {metrics.url_name} не задан бюджет '
+            'запросов.'
+        )
+    if metrics.over_budget:
+        raise AssertionError(
+            f'{metrics.method} {metrics.url_name}: '
+            f'{metrics.queries} запросов при бюджете {metrics.query_budget}.'
+        )
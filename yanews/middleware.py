@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.utils.cache import patch_cache_control
+
+from .metrics import RequestMetrics, current_metrics, track_queries
+from .routers import RoutingState, current_routing
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+logger = logging.getLogger('yanews.metrics')
+
+
+class RequestMetricsMiddleware:
+    """
+    Считает SQL-запросы, время базы, шаблонов и всего запроса.
+
+    Метрики пишутся в лог ``yanews.metrics`` одной JSON-строкой,
+    отдаются заголовком Server-Timing и остаются на ``response.metrics``
+    для проверок в тестах. Превышение бюджета запросов из
+    ``settings.QUERY_BUDGETS`` логируется как предупреждение.
+
+    Работает и под ASGI, не переводя цепочку в синхронный режим.
+    Синхронные представления и middleware Django выполняет там в одном
+    потоке запроса, поэтому обёртки соединений ставятся в этом потоке;
+    запросы асинхронных представлений считает их пул потоков.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = perf_counter()
+        try:
+            with track_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            metrics.total_time = perf_counter() - start
+            current_metrics.reset(token)
+        return self.process_response(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = perf_counter()
+        tracking = ExitStack()
+        await sync_to_async(tracking.enter_context)(track_queries(metrics))
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(tracking.close)()
+            metrics.total_time = perf_counter() - start
+            current_metrics.reset(token)
+        return self.process_response(request, response, metrics)
+
+    def process_response(self, request, response, metrics):
+        if request.resolver_match:
+            metrics.url_name = request.resolver_match.view_name
+        metrics.method = request.method
+        level = logging.WARNING if metrics.over_budget else logging.INFO
+        logger.log(level, json.dumps(metrics.as_log()))
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = metrics.server_timing()
+        response.metrics = metrics
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Решает, может ли запрос читать с реплик (см. :mod:`yanews.routers`).
+
+    Пользователю, который что-то записал, ставит cookie, закрепляющую
+    его за основной базой на ``REPLICA_PIN_SECONDS`` секунд.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        state = self.get_state(request)
+        token = current_routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.process_response(response, state)
+
+    async def __acall__(self, request):
+        state = self.get_state(request)
+        token = current_routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.process_response(response, state)
+
+    @staticmethod
+    def get_state(request):
+        return RoutingState(
+            pinned=(
+                request.method not in SAFE_METHODS
+                or settings.REPLICA_PIN_COOKIE in request.COOKIES
+            ),
+        )
+
+    @staticmethod
+    def process_response(response, state):
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class AnonymousCacheMiddleware:
+    """
+    Ответы анонимным читателям без ``Vary: Cookie``.
+
+    Запрос GET или HEAD без cookie сессии и сообщений к странице из
+    ``settings.ANONYMOUS_CACHE_URLS`` не читает сессию из базы и не
+    создаёт её. Его ответ одинаков для всех анонимных читателей, поэтому
+    ``Vary: Cookie`` только дробил бы кэши браузеров и прокси по
+    посторонним cookie. Вместо него ставится ``Cache-Control: public,
+    no-cache``: кэш всегда перепроверяет страницу, а ETag страниц
+    различает зрителей (см. ``news.views.viewer_etag``). Поэтому вошедший
+    пользователь не получит анонимную копию, а ответ 304 обходится без
+    запросов к базе. Страницы вошедших пользователей помечаются
+    ``private``.
+
+    Стоит перед ``SessionMiddleware``, чтобы убрать заголовок, который
+    та добавляет.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    @staticmethod
+    def is_anonymous_read(request, response):
+        return (
+            request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and CookieStorage.cookie_name not in request.COOKIES
+            # Ответ, который ставит cookie (например, CSRF), не общий.
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+        )
+
+    def process_response(self, request, response):
+        match = request.resolver_match
+        if match is None or match.view_name not in (
+            settings.ANONYMOUS_CACHE_URLS
+        ):
+            return response
+        if not self.is_anonymous_read(request, response):
+            patch_cache_control(response, private=True)
+            return response
+        vary = [
+            header.strip()
+            for header in response.get('Vary', '').split(',')
+            if header.strip() and header.strip().lower() != 'cookie'
+        ]
+        if vary:
+            response['Vary'] = ', '.join(vary)
+        elif response.has_header('Vary'):
+            del response['Vary']
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
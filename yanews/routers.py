@@ -0,0 +1,140 @@
+"""Чтение с реплик и запись в основную базу.
+
+Чтение уходит на реплики из ``settings.DATABASE_REPLICAS`` только внутри
+запроса, прошедшего через :class:`yanews.middleware.ReplicaMiddleware`;
+команды и воркеры всегда работают с основной базой.
+
+Реплика отстаёт, поэтому запрос читает из основной базы, если он:
+
+* изменяющий (POST и прочие небезопасные методы);
+* уже что-то записал или находится внутри транзакции;
+* пришёл от пользователя, который записывал что-то за последние
+  ``REPLICA_PIN_SECONDS`` секунд: таким middleware ставит cookie.
+
+Так автор сразу видит свой комментарий после перенаправления на
+``#comments``. Кэш фрагментов закреплённые запросы не читают, а
+перезаписывают: иначе автор получил бы фрагмент, собранный другим
+читателем с отстающей реплики.
+
+Остальные читатели тоже не должны видеть реплику старше версии кэша,
+которую запрос уже прочитал (:func:`require_version`): иначе разметка
+со старыми данными попала бы в кэш и в ETag под новой версией и жила бы
+до следующего изменения. Поэтому у каждой реплики в кэше
+``settings.NEWS_CACHE`` хранится момент, на который она скопирована, в
+тех же наносекундах, что и версии. Запрос читает только реплики, не
+старше его версии, а если таких нет — основную базу.
+
+Локально реплика — второй файл SQLite (``YANEWS_DB_REPLICA``), который
+обновляет ``manage.py sync_replicas``. Реплика без отметки о копии
+годится только для страниц без версий.
+"""
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+REPLICA_SYNCED_KEY = 'replica:{alias}:synced'
+
+
+@dataclass
+class RoutingState:
+    """Куда читает текущий запрос; общий для потоков пула запроса."""
+    pinned: bool = False
+    wrote: bool = False
+    # Самая новая версия кэша, прочитанная запросом.
+    version: int = 0
+    # Моменты копий реплик, читаются из кэша один раз за запрос.
+    synced: dict = field(default=None, repr=False)
+
+    @property
+    def use_primary(self):
+        return self.pinned or self.wrote
+
+    def fresh_replicas(self):
+        """Реплики, в которых уже есть данные версии ``self.version``."""
+        if self.synced is None:
+            self.synced = replica_sync_points()
+        return [
+            alias for alias, synced in self.synced.items()
+            if synced >= self.version
+        ]
+
+
+current_routing = ContextVar('current_routing', default=None)
+
+
+def is_pinned():
+    """Текущий запрос обязан видеть свежие данные основной базы."""
+    state = current_routing.get()
+    return state is not None and state.use_primary
+
+
+def require_version(version):
+    """Дальше запрос читает только реплики, в которых есть ``version``."""
+    state = current_routing.get()
+    if state is not None and version > state.version:
+        state.version = version
+
+
+def replica_sync_points():
+    keys = {
+        alias: REPLICA_SYNCED_KEY.format(alias=alias)
+        for alias in settings.DATABASE_REPLICAS
+    }
+    synced = caches[settings.NEWS_CACHE].get_many(keys.values())
+    return {alias: synced.get(key, 0) for alias, key in keys.items()}
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = current_routing.get()
+        if (
+            state is None
+            or state.use_primary
+            or not settings.DATABASE_REPLICAS
+            or connections[PRIMARY].in_atomic_block
+        ):
+            return PRIMARY
+        replicas = state.fresh_replicas()
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def sync_replicas():
+    """
+    Копирует основную базу SQLite во все реплики.
+
+    Локальная замена репликации: реплики видят данные на момент копии.
+    Момент запоминается до начала копии, поэтому в реплике точно есть
+    всё, что было закоммичено раньше него.
+    """
+    primary = connections[PRIMARY]
+    primary.ensure_connection()
+    for alias in settings.DATABASE_REPLICAS:
+        replica = connections[alias]
+        replica.ensure_connection()
+        synced = time.time_ns()
+        primary.connection.backup(replica.connection)
+        caches[settings.NEWS_CACHE].set(
+            REPLICA_SYNCED_KEY.format(alias=alias), synced, timeout=None
+        )
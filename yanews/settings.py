@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -21,7 +22,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.middleware.RequestMetricsMiddleware',
+    'yanews.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'yanews.middleware.AnonymousCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -34,7 +38,7 @@ ROOT_URLCONF = 'yanews.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yanews.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -51,14 +55,109 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yanews.wsgi.application'
 
 
+# Профиль SQLite для нагрузки (YANEWS_SQLITE_TUNING=1): журнал WAL, при
+# котором читатели и писатель не ждут друг друга, постоянные соединения
+# и BEGIN IMMEDIATE, чтобы пишущие транзакции ждали блокировку.
+SQLITE_TUNING = os.environ.get('YANEWS_SQLITE_TUNING') == '1'
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    # В режиме WAL теряются только последние транзакции при сбое питания,
+    # но не целостность базы.
+    'synchronous': 'normal',
+    # Отрицательное значение — размер в КиБ.
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+# Сколько секунд соединение ждёт блокировку, прежде чем сообщить
+# database is locked.
+SQLITE_BUSY_TIMEOUT = 20 if SQLITE_TUNING else 5
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yanews.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'timeout': SQLITE_BUSY_TIMEOUT},
+        'PRAGMAS': SQLITE_PRAGMAS if SQLITE_TUNING else {},
+        'TRANSACTION_MODE': 'IMMEDIATE' if SQLITE_TUNING else None,
+        'CONN_MAX_AGE': 600 if SQLITE_TUNING else 0,
+        'CONN_HEALTH_CHECKS': SQLITE_TUNING,
+    }
+}
+
+# Реплики для чтения — псевдонимы из DATABASES. Локально реплика —
+# второй файл SQLite, который обновляет manage.py sync_replicas.
+DATABASE_REPLICAS = []
+
+if os.environ.get('YANEWS_DB_REPLICA'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': Path(os.environ['YANEWS_DB_REPLICA']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+
+DATABASE_ROUTERS = ['yanews.routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи пользователь читает из основной базы;
+# должно быть больше отставания реплик.
+REPLICA_PIN_SECONDS = 5
+
+REPLICA_PIN_COOKIE = 'primary'
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
 
+# Хранилище сессий (YANEWS_SESSIONS):
+# db — таблица в базе, каждый запрос вошедшего пользователя читает её;
+# cache — кэш с записью в базу; при нескольких процессах нужен общий кэш;
+# cookies — подписанная cookie без обращений к базе, но сессию нельзя
+# отозвать на сервере, пока не истечёт SESSION_COOKIE_AGE.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cached_db',
+    'cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('YANEWS_SESSIONS', 'db')]
+
+# Страницы, ответы которых анонимным читателям без cookie сессии
+# кэшируются без Vary: Cookie (см. AnonymousCacheMiddleware).
+ANONYMOUS_CACHE_URLS = (
+    'news:home',
+    'news:archive_year',
+    'news:archive_month',
+    'news:archive_day',
+    'news:detail',
+)
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'require_debug_true': {'()': 'django.utils.log.RequireDebugTrue'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'filters': ['require_debug_true'],
+        },
+    },
+    'loggers': {
+        'yanews.metrics': {'handlers': ['console'], 'level': 'INFO'},
+        'news.moderation': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+
 AUTH_PASSWORD_VALIDATORS = []
 
 
@@ -80,3 +179,126 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+NEWS_TEASER_WORDS = 15
+
+COMMENTS_COUNT_ON_DETAIL_PAGE = 20
+
+USER_COMMENTS_ON_PAGE = 20
+
+SEARCH_RESULTS_ON_PAGE = 20
+
+API_PAGE_SIZE = 50
+
+# Сколько комментариев можно добавить, изменить или удалить подряд и за
+# сколько секунд: (rate, period). None снимает ограничение.
+COMMENT_RATE_LIMITS = {
+    # Ведро на сессию, а не на пользователя: ключ берётся из cookie, чтобы
+    # отвечать 429 без запросов к базе. У пользователя, вошедшего с
+    # нескольких устройств или несколько раз, у каждой сессии свой лимит;
+    # общий потолок для них задаёт ведро IP.
+    'user': (10, 60),
+    # Например, (60, 60): с одного адреса могут писать несколько
+    # пользователей за NAT. За обратным прокси включайте только вместе с
+    # CLIENT_IP_HEADER, иначе лимит будет общим на весь сайт.
+    'ip': None,
+}
+
+# Заголовок с адресом клиента, который ставит обратный прокси, в виде
+# ключа request.META, например 'HTTP_X_FORWARDED_FOR'. None — REMOTE_ADDR.
+CLIENT_IP_HEADER = None
+
+# Где хранятся вёдра ограничения. При нескольких процессах нужен
+# news.ratelimit.CacheBuckets с общим кэшем RATE_LIMIT_CACHE.
+COMMENT_RATE_LIMITER = 'news.ratelimit.LocalBuckets'
+
+RATE_LIMIT_CACHE = 'default'
+
+# Сколько строк выгрузки читается из базы за один раз.
+EXPORT_CHUNK_SIZE = 2000
+
+# Псевдоним кэша из CACHES для фрагментов разметки новостей.
+NEWS_CACHE = 'default'
+
+NEWS_CACHE_TIMEOUT = 300
+
+# Файл с дополнительными запрещёнными словами, по одному в строке.
+BAD_WORDS_FILE = None
+
+PROFANITY_WHOLE_WORDS = False
+
+PROFANITY_RELOAD_INTERVAL = 5
+
+SERVER_TIMING_HEADER = DEBUG
+
+# Асинхронные варианты страниц новостей; asgi.py включает их по умолчанию.
+ASYNC_VIEWS = os.environ.get('YANEWS_ASYNC_VIEWS') == '1'
+
+# Размер пула потоков асинхронных страниц и число их соединений с базой.
+ASYNC_VIEW_WORKERS = 8
+
+# Раздача новых комментариев через SSE (только под ASGI).
+# При нескольких процессах нужен news.live.PollingBroker.
+LIVE_BROKER = 'news.live.LocalBroker'
+
+LIVE_POLL_INTERVAL = 1
+
+# Сколько событий ждёт медленного читателя, прежде чем он будет
+# отключён и дочитает пропущенное из базы.
+LIVE_QUEUE_SIZE = 100
+
+# Размер пачки, которыми переподключившийся читатель дочитывает
+# пропущенные комментарии из базы.
+LIVE_REPLAY_LIMIT = 50
+
+LIVE_HEARTBEAT = 15
+
+LIVE_RETRY = 3
+
+# Комментарии сохраняются «на модерации» и публикуются воркером
+# manage.py moderate_comments.
+COMMENT_MODERATION = False
+
+COMMENT_MODERATION_BATCH_SIZE = 100
+
+COMMENT_MODERATION_INTERVAL = 1
+
+# Классификаторы модерации: принимают список комментариев и возвращают
+# {id: причина} для отклонённых.
+COMMENT_CLASSIFIERS = (
+    'news.moderation.form_check',
+)
+
+# С какого размера таблицы админка показывает оценку числа строк
+# вместо COUNT(*).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+
+# Сколько лучших совпадений из поискового индекса показывает админка.
+ADMIN_SEARCH_LIMIT = 1000
+
+# Сколько SQL-запросов допускается на один запрос к странице: по имени
+# URL или по «МЕТОД имя», если методам нужны разные бюджеты.
+QUERY_BUDGETS = {
+    'news:home': 3,
+    'news:archive_year': 3,
+    'news:archive_month': 3,
+    'news:archive_day': 3,
+    'news:detail': 8,
+    'news:search': 4,
+    'news:api_news_list': 1,
+    'news:api_news_detail': 1,
+    'news:api_comments': 2,
+    # Сессия, пользователь, новость, запись комментария и счётчика; ещё
+    # два — первая загрузка списка запрещённых слов в процессе.
+    'POST news:detail': 7,
+    'news:user_comments': 3,
+    'news:edit': 3,
+    'POST news:edit': 4,
+    'news:delete': 3,
+    'POST news:delete': 5,
+    'news:moderation': 3,
+    'admin:news_news_changelist': 9,
+    'admin:news_news_change': 6,
+    'admin:news_comment_changelist': 6,
+    'admin:news_comment_change': 8,
+}
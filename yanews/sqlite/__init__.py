@@ -0,0 +1,6 @@
+"""Бэкенд SQLite с профилем для нагрузки.
+
+Подключается как ``'ENGINE': 'yanews.sqlite'``. Без дополнительных
+ключей ведёт себя как стандартный ``django.db.backends.sqlite3``;
+ключи ``DATABASES`` описаны в :mod:`yanews.sqlite.base`.
+"""
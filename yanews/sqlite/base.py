@@ -0,0 +1,67 @@
+"""
+Настройки соединения, которых нет в бэкенде SQLite Django 3.2.
+
+Дополнительные ключи описания базы в ``DATABASES``:
+
+* ``PRAGMAS`` — словарь PRAGMA, выполняемых на каждом новом соединении
+  (``journal_mode``, ``synchronous``, ``cache_size``, ``mmap_size``...);
+* ``TRANSACTION_MODE`` — как открывать транзакции ``atomic``:
+  ``IMMEDIATE`` сразу берёт блокировку записи и ждёт её ``timeout``
+  секунд, тогда как обычный ``BEGIN`` при попытке записи после чтения
+  получает ``database is locked`` без ожидания;
+* ``CONN_HEALTH_CHECKS`` — проверять постоянное соединение, когда
+  запрос впервые обращается к нему, как в Django 4.1: один ``SELECT 1``
+  на запрос и только если соединение уже было открыто.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}').fetchall()
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict.get('TRANSACTION_MODE')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
+
+    health_check_done = False
+
+    def connect(self):
+        super().connect()
+        # Новое соединение проверять незачем.
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.settings_dict.get('CONN_HEALTH_CHECKS')
+            or self.health_check_done
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        """
+        Вызывается в начале и конце запроса; само соединение проверяется
+        лениво, при первом обращении следующего запроса.
+        """
+        if self.connection is not None:
+            self.health_check_done = False
+        super().close_if_unusable_or_obsolete()